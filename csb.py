@@ -370,6 +370,26 @@ class EnvCommands():
             names = [env['name'] for env in envs]
             print("\n".join(names))
 
+    @staticmethod
+    def run(args):
+        parser = ArgumentParser(prog="csb env run", description="Run all scenarios of an environment.")
+        parser.add_argument("path", type=str, help="Path to the environment directory.")
+        parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of worker processes. 0 uses all cores.")
+        parser.add_argument("--engine", type=str, default="native", choices=["native", "bdsim"], help="Simulation engine.")
+        parser.add_argument("--system", type=str, default=None, help="Id of the system instance to use.")
+        parser.add_argument("--controllers", type=str, default=None, help="Comma separated ids of the controllers to use.")
+        parser.add_argument("--output-dir", type=str, default=None, help="Directory the signals of every scenario are streamed to.")
+        run_args = parser.parse_args(args)
+
+        from m_scripts.eval_metrics import load_metrics, eval_metrics
+        controller_ids = run_args.controllers.split(",") if run_args.controllers else None
+        outputs = PythonBackend.run_all_scenarios(run_args.path, run_args.system, controller_ids,
+            jobs=run_args.jobs, engine=run_args.engine, output_dir=run_args.output_dir)
+        metrics = load_metrics(run_args.path)
+        for i, out in enumerate(outputs):
+            print(f"Scenario {i}:")
+            print(eval_metrics(metrics.post_metrics, out))
+
     @staticmethod
     def remove(args):
         if not args:
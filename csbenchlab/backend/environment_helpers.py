@@ -4,7 +4,10 @@ from csbenchlab.eval_parameters import eval_environment_params
 import os
 from pathlib import Path
 from csbenchlab.scenario_templates.control_environment import ControlEnvironment
+from csbenchlab.sim_output import SimOutput
+from concurrent.futures import ProcessPoolExecutor
 from uuid import uuid4
+import numpy as np
 
 def load_control_environment_params_and_data(cls, env_path, system_instance:str=None, controller_ids:str=None):
 
@@ -136,13 +139,377 @@ def get_system_dims(cls, system_description: dict, params) -> dict:
     return dims
 
 
+def build_control_environment(cls, env_path, system_instance:str=None, controller_ids:str=None,
+                              engine="bdsim", live_metrics=None, profile=False):
+    """
+    Loads, generates and compiles the control environment at the given path.
+
+    Args:
+        env_path (str): The path to the control environment.
+        system_instance (str): Id of the system instance to use.
+        controller_ids (list): Ids of the controllers to use. All controllers are used if None.
+        engine (str): Simulation engine used by `ControlEnvironment.run`.
+        live_metrics (list): Live metric classes evaluated during the simulation.
+        profile (bool): Record the step times of the blocks, see `ControlEnvironment.set_profiling`.
+    Returns:
+        ControlEnvironment: The environment ready to select a scenario and run.
+    """
+    env_params, data = cls.load_control_environment_params_and_data(env_path, system_instance, controller_ids)
+    env = ControlEnvironment(env_path, data.metadata, backend=cls, engine=engine, profile=profile)
+    env.generate({
+            "system": data.systems[0],
+            "controllers": data.controllers
+        },
+        env_params=env_params,
+        generate_scopes=False,
+        live_metrics=live_metrics
+    )
+    if engine == "bdsim":
+        # compilation evaluates the block outputs, so a scenario has to be set first
+        if len(env.get_scenarios()) > 0:
+            env.select_scenario(0)
+        env.compile()
+    return env
+
+
+def run_scenario(env, index, output_dir=None):
+    """
+    Runs a single scenario of a generated environment and returns the watched
+    signals as a dictionary of arrays. If `output_dir` is given, the signals are
+    streamed to the 'scenario_<index>' run directory in it and its path is returned instead.
+
+    The global NumPy random generator is seeded with the scenario 'RandomSeed'
+    so the result does not depend on which process runs the scenario.
+    """
+    scenario = env.select_scenario(index)
+    np.random.seed(scenario.get("RandomSeed", 42))
+    if output_dir is not None:
+        out = env.run(T=scenario["SimulationTime"], output_dir=Path(output_dir) / f"scenario_{index}")
+        return out.path
+    out = env.run(T=scenario["SimulationTime"])
+    return out.to_dict()
+
+
+def run_scenario_evaluation(env, index, seed, metrics):
+    """
+    Runs one Monte Carlo evaluation of a scenario and returns only its metric results.
+
+    Args:
+        env (ControlEnvironment): Generated environment.
+        index (int): Scenario index.
+        seed (np.random.SeedSequence): Random stream of this evaluation.
+        metrics (list): Post metrics evaluated on the simulation output.
+    Returns:
+        list: Metric result dictionaries, one per metric.
+    """
+    from m_scripts.eval_metrics import eval_metric
+    scenario = env.select_scenario(index)
+    env.seed_disturbances(seed)
+    np.random.seed(seed.generate_state(1)[0])
+    out = env.run(T=scenario["SimulationTime"])
+    return [eval_metric(m, out) for m in metrics]
+
+
+def run_scenario_evaluation_batch(env, index, seeds, metrics):
+    """
+    Runs Monte Carlo evaluations of a scenario in lockstep with `ControlEnvironment.run_batch`
+    and returns their metric results.
+
+    Args:
+        env (ControlEnvironment): Generated environment.
+        index (int): Scenario index.
+        seeds (list): np.random.SeedSequence random stream of every evaluation.
+        metrics (list): Post metrics evaluated on the simulation outputs.
+    Returns:
+        list: For every evaluation, the metric result dictionaries, one per metric.
+    """
+    from m_scripts.eval_metrics import eval_metric
+    scenario = env.select_scenario(index)
+    outs = env.run_batch(scenario["SimulationTime"], seeds)
+    return [[eval_metric(m, out) for m in metrics] for out in outs]
+
+
+def aggregate_metric_results(results, percentiles=(5, 50, 95)):
+    """
+    Aggregates metric results of multiple evaluations.
+
+    Args:
+        results (list): For every evaluation, a list of metric result dictionaries.
+        percentiles (tuple): Percentiles to compute.
+    Returns:
+        list: For every metric, a dictionary mapping each numeric result key to
+            its 'mean', 'std', 'min', 'max' and 'percentiles' arrays.
+    """
+    if len(results) == 0:
+        return []
+    aggregated = []
+    for i in range(len(results[0])):
+        metric_agg = {}
+        for key in results[0][i].keys():
+            try:
+                values = np.array([r[i][key] for r in results], dtype=float)
+            except (TypeError, ValueError):
+                # non numeric results cannot be aggregated
+                continue
+            metric_agg[key] = {
+                'mean': np.mean(values, axis=0),
+                'std': np.std(values, axis=0),
+                'min': np.min(values, axis=0),
+                'max': np.max(values, axis=0),
+                'percentiles': {p: np.percentile(values, p, axis=0) for p in percentiles},
+            }
+        aggregated.append(metric_agg)
+    return aggregated
+
+
+def run_scenario_point(env, index, point, metrics):
+    """
+    Runs a scenario with parameter overrides merged in and returns its metric results.
+
+    Args:
+        env (ControlEnvironment): Generated environment.
+        index (int): Scenario index.
+        point (dict): 'SystemParameterOverrides' and 'DisturbanceParameterOverrides' to apply.
+        metrics (list): Post metrics evaluated on the simulation output.
+    Returns:
+        list: Metric result dictionaries, one per metric.
+    """
+    from m_scripts.eval_metrics import eval_metric
+    scenario = dict(env.get_scenarios()[index])
+    for group, overrides in point.items():
+        scenario[group] = {**(scenario.get(group, None) or {}), **overrides}
+    env.reset(scenario)
+    np.random.seed(scenario.get("RandomSeed", 42))
+    out = env.run(T=scenario["SimulationTime"])
+    return [eval_metric(m, out) for m in metrics]
+
+
+__worker_env = None
+__worker_metrics = None
+
+def _init_scenario_worker(env_path, system_instance, controller_ids, engine):
+    global __worker_env
+    from csbenchlab.backend.python_backend import PythonBackend
+    __worker_env = PythonBackend.build_control_environment(env_path, system_instance, controller_ids, engine=engine)
+
+def _init_monte_carlo_worker(env_path, system_instance, controller_ids, engine):
+    global __worker_metrics
+    from m_scripts.eval_metrics import load_metrics
+    _init_scenario_worker(env_path, system_instance, controller_ids, engine)
+    __worker_metrics = load_metrics(env_path).post_metrics
+
+def _run_scenario_worker(task):
+    index, output_dir = task
+    return run_scenario(__worker_env, index, output_dir)
+
+def _run_scenario_points_worker(task):
+    index, points = task
+    return [run_scenario_point(__worker_env, index, p, __worker_metrics) for p in points]
+
+def _scenario_evaluation_options_worker():
+    return [{"NumEvaluations": s.get("NumEvaluations", 1), "RandomSeed": s.get("RandomSeed", None)}
+            for s in __worker_env.get_scenarios()]
+
+def _run_scenario_evaluation_worker(task):
+    index, seed = task
+    return run_scenario_evaluation(__worker_env, index, seed, __worker_metrics)
+
+def _run_scenario_evaluation_batch_worker(task):
+    index, seeds = task
+    return run_scenario_evaluation_batch(__worker_env, index, seeds, __worker_metrics)
+
+
+def run_all_scenarios(cls, env_path, system_instance:str=None, controller_ids:str=None, jobs=1, engine="native",
+                      output_dir=None):
+    """
+    Runs all scenarios of the control environment, optionally in parallel.
+
+    Every worker process generates the environment once and then runs the scenarios
+    it receives. Results are returned in scenario order and are independent of the
+    number of workers.
+
+    Args:
+        env_path (str): The path to the control environment.
+        system_instance (str): Id of the system instance to use.
+        controller_ids (list): Ids of the controllers to use. All controllers are used if None.
+        jobs (int): Number of worker processes. If 1, scenarios are run in the current process.
+        engine (str): Simulation engine used by `ControlEnvironment.run`.
+        output_dir (str): Directory the signals of every scenario are streamed to.
+            Workers then only return run directory paths. Signals are kept in memory if None.
+    Returns:
+        list: A `SimOutput` for every scenario of the environment.
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    num_scenarios = len(EnvironmentDataManager(env_path).get_components('scenario'))
+    if num_scenarios == 0:
+        return []
+
+    if jobs == 1:
+        env = cls.build_control_environment(env_path, system_instance, controller_ids, engine=engine)
+        results = [run_scenario(env, i, output_dir) for i in range(num_scenarios)]
+    else:
+        jobs = min(jobs, num_scenarios)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_scenario_worker,
+                initargs=(env_path, system_instance, controller_ids, engine)) as executor:
+            results = list(executor.map(_run_scenario_worker,
+                [(i, output_dir) for i in range(num_scenarios)]))
+    if output_dir is not None:
+        return [SimOutput.open(r) for r in results]
+    return [SimOutput(r) for r in results]
+
+
+def run_monte_carlo(cls, env_path, system_instance:str=None, controller_ids:str=None, jobs=1,
+                    engine="native", percentiles=(5, 50, 95), batch_size=1):
+    """
+    Runs every scenario of the control environment 'NumEvaluations' times and
+    aggregates the post metric results of all evaluations.
+
+    Each evaluation gets an independent random stream spawned from the scenario
+    'RandomSeed' with np.random.SeedSequence, so the results are reproducible and
+    do not depend on the number of workers. Only metric results are sent back from
+    the workers, simulation traces are discarded after the metrics are evaluated.
+
+    Args:
+        env_path (str): The path to the control environment.
+        system_instance (str): Id of the system instance to use.
+        controller_ids (list): Ids of the controllers to use. All controllers are used if None.
+        jobs (int): Number of worker processes. If 1, evaluations are run in the current process.
+        engine (str): Simulation engine used by `ControlEnvironment.run`.
+        percentiles (tuple): Percentiles of the metric results to compute.
+        batch_size (int): Number of evaluations of a scenario simulated in lockstep with
+            `ControlEnvironment.run_batch`. Evaluations are run one by one if 1.
+    Returns:
+        list: For every scenario, a dictionary with 'NumEvaluations', 'RandomSeed' and
+            the aggregated 'Metrics' (see `aggregate_metric_results`).
+    """
+    from m_scripts.eval_metrics import load_metrics
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    def evaluation_tasks(scenarios):
+        tasks = []
+        for i, scenario in enumerate(scenarios):
+            num_evaluations = int(scenario.get("NumEvaluations", 1))
+            seeds = np.random.SeedSequence(scenario.get("RandomSeed", None)).spawn(num_evaluations)
+            tasks.extend((i, seed) for seed in seeds)
+        return tasks
+
+    def evaluation_batches(tasks):
+        # consecutive evaluations of the same scenario are simulated together
+        batches = []
+        for i, seed in tasks:
+            if len(batches) == 0 or batches[-1][0] != i or len(batches[-1][1]) == batch_size:
+                batches.append((i, []))
+            batches[-1][1].append(seed)
+        return batches
+
+    if jobs == 1:
+        env = cls.build_control_environment(env_path, system_instance, controller_ids, engine=engine)
+        metrics = load_metrics(env_path).post_metrics
+        scenarios = env.get_scenarios()
+        tasks = evaluation_tasks(scenarios)
+        if batch_size > 1:
+            results = [r for i, seeds in evaluation_batches(tasks)
+                       for r in run_scenario_evaluation_batch(env, i, seeds, metrics)]
+        else:
+            results = [run_scenario_evaluation(env, i, seed, metrics) for i, seed in tasks]
+    else:
+        if len(EnvironmentDataManager(env_path).get_components('scenario')) == 0:
+            return []
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_monte_carlo_worker,
+                initargs=(env_path, system_instance, controller_ids, engine)) as executor:
+            # 'NumEvaluations' and 'RandomSeed' are set by the scenario functions, which are evaluated
+            # when the environment is generated, so they are taken from a worker's environment
+            scenarios = executor.submit(_scenario_evaluation_options_worker).result()
+            tasks = evaluation_tasks(scenarios)
+            if batch_size > 1:
+                results = [r for rs in executor.map(_run_scenario_evaluation_batch_worker, evaluation_batches(tasks))
+                           for r in rs]
+            else:
+                chunksize = max(1, len(tasks) // (4 * jobs))
+                results = list(executor.map(_run_scenario_evaluation_worker, tasks, chunksize=chunksize))
+
+    ret = []
+    for i, scenario in enumerate(scenarios):
+        scenario_results = [r for (s_idx, _), r in zip(tasks, results) if s_idx == i]
+        ret.append({
+            "NumEvaluations": len(scenario_results),
+            "RandomSeed": scenario.get("RandomSeed", None),
+            "Metrics": aggregate_metric_results(scenario_results, percentiles),
+        })
+    return ret
+
+
+def run_parameter_sweep(cls, env_path, multi_scenario, scenario_index=0, system_instance:str=None,
+                        controller_ids:str=None, jobs=1, engine="native", chunk_size=None):
+    """
+    Runs a scenario for every parameter point of a `MultiScenario`.
+
+    The points are expanded with `expand_multi_scenario` and scheduled in chunks over
+    worker processes. Each worker generates the environment once and only applies the
+    system and disturbance parameter overrides per point. Results are streamed into a
+    `SweepResultTable` as the chunks finish.
+
+    Args:
+        env_path (str): The path to the control environment.
+        multi_scenario (MultiScenario): Parameter ranges or values to sweep.
+        scenario_index (int): Index of the scenario the overrides are applied to.
+        system_instance (str): Id of the system instance to use.
+        controller_ids (list): Ids of the controllers to use. All controllers are used if None.
+        jobs (int): Number of worker processes. If 1, points are run in the current process.
+        engine (str): Simulation engine used by `ControlEnvironment.run`.
+        chunk_size (int): Number of points sent to a worker at once.
+    Returns:
+        SweepResultTable: One row per point with the 'Point' index, the flattened
+            parameter values and the metric results as '<metric id>.<key>' columns.
+    """
+    from m_scripts.eval_metrics import load_metrics
+    from csbenchlab.multi_scenario import expand_multi_scenario, flatten_point, SweepResultTable
+
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    points = expand_multi_scenario(multi_scenario)
+    metrics = load_metrics(env_path).post_metrics
+    metric_ids = [Path(m.file_path).parent.name for m in metrics]
+    if chunk_size is None:
+        chunk_size = max(1, len(points) // (4 * jobs))
+    chunks = [(scenario_index, points[i:i + chunk_size]) for i in range(0, len(points), chunk_size)]
+
+    def chunk_results():
+        if jobs == 1:
+            env = cls.build_control_environment(env_path, system_instance, controller_ids, engine=engine)
+            for index, chunk in chunks:
+                yield [run_scenario_point(env, index, p, metrics) for p in chunk]
+        else:
+            with ProcessPoolExecutor(max_workers=min(jobs, max(len(chunks), 1)), initializer=_init_monte_carlo_worker,
+                    initargs=(env_path, system_instance, controller_ids, engine)) as executor:
+                yield from executor.map(_run_scenario_points_worker, chunks)
+
+    table = SweepResultTable()
+    i = 0
+    for results in chunk_results():
+        for metric_results in results:
+            row = {"Point": i, **flatten_point(points[i])}
+            for metric_id, result in zip(metric_ids, metric_results):
+                for key, value in result.items():
+                    row[f"{metric_id}.{key}"] = value
+            table.append(row)
+            i += 1
+    return table
+
+
 __all__ = ['generate_control_environment',
            'create_environment',
            'is_valid_environment_path',
            'setup_environment',
            'get_system_dims',
            'get_env_name',
-           'load_control_environment_params_and_data']
+           'load_control_environment_params_and_data',
+           'build_control_environment',
+           'run_all_scenarios',
+           'run_monte_carlo',
+           'run_parameter_sweep']
 
 
 
@@ -151,35 +518,24 @@ env_eval_file = """
 from argparse import ArgumentParser
 from csbenchlab.backend.python_backend import PythonBackend
 from csbenchlab.scenario_templates.control_environment import ControlEnvironment
-from m_scripts.eval_metrics import eval_metrics
+from m_scripts.eval_metrics import load_metrics, eval_metrics
 from bdsim import BDSim
 from matplotlib import pyplot as plt
 
 
 def eval_control_environment(env_path, system_instance:str=None, controller_ids:str=None):
-    backend = PythonBackend()
-    env_params, data = backend.load_control_environment_params_and_data(env_path, system_instance, controller_ids)
-
-    env = ControlEnvironment(env_path, data.metadata, backend=backend)
-
     metrics = load_metrics(env_path)
-    env.generate({{
-            "system": data.systems[0],
-            "controllers": data.controllers
-        }},
-        env_params=env_params,
-        generate_scopes=False,
-        live_metrics=[m.metric for m in metrics.live_metrics]
-    )
-
-    scenario = env.select_scenario(0)
-    env.compile()
-    out = env.run(T=scenario["SimulationTime"])
-
-
-    r = eval_metrics(metrics.post_metrics, out)
+    # the environment is generated and compiled once, every scenario only resets it
+    env = PythonBackend.build_control_environment(env_path, system_instance, controller_ids,
+        live_metrics=[m.metric for m in metrics.live_metrics])
+
+    for i in range(len(env.get_scenarios())):
+        scenario = env.reset(i)
+        out = env.run(T=scenario["SimulationTime"])
+        r = eval_metrics(metrics.post_metrics, out)
+        print(f"Scenario {{i}}:")
+        print(r)
     plt.show()
-    print(r)
 
 
 def main():
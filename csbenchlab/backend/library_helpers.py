@@ -3,38 +3,11 @@ import os, json5, json, warnings, shutil
 from pathlib import Path
 from uuid import uuid4
 from csbenchlab.plugin_helpers import import_module_from_path
+from csbenchlab.registry_index import get_registry_index
 
 
 def get_available_plugins(cls):
-    reg = get_app_registry_path()
-    fs = os.listdir(reg)
-    plugins = {}
-    for n in fs:
-        # Skip '.' '..' 'slprj'
-        if n in ['.', '..', 'slprj']:
-            continue
-        full_path = os.path.join(reg, n)
-        if os.path.isdir(full_path):
-            manifest_file = os.path.join(full_path, 'autogen', 'manifest.json')
-        elif n.endswith('.json'):
-            with open(full_path, 'r') as f:
-                s = json5.load(f)
-                lib = s['Path']
-                manifest_file = os.path.join(lib, 'autogen', 'manifest.json')
-        if os.path.isfile(manifest_file):
-            with open(manifest_file, 'r') as f:
-                data = json5.load(f)
-                for k, v in data["Registry"].items():
-                    if not isinstance(v, list):
-                        v = [v]
-                        data["Registry"][k] = v
-                    for it in v:
-                        it["Lib"] = data["Library"]
-                        it["LibVersion"] = data["Version"]
-
-                plugins[data["Library"]] = data["Registry"]
-
-    return plugins
+    return get_registry_index().plugins()
 
 
 def get_library_path(cls, lib_name):
@@ -42,25 +15,8 @@ def get_library_path(cls, lib_name):
     if cls.is_valid_component_library(lib_name):
         return lib_name
 
-    reg = get_app_registry_path()
-    fs = os.listdir(reg)
-
-    for n in fs:
-        # Skip '.' '..' 'slprj' or non-matching names
-        if n in ['.', '..', 'slprj']:
-            continue
-        if not (n == lib_name or n == f"{lib_name}.json"):
-            continue
-
-        full_path = os.path.join(reg, n)
-        if os.path.isdir(full_path):
-            return full_path
-        elif n.endswith('.json'):
-            with open(full_path, 'r') as f:
-                s = json5.load(f)
-                lib = s['Path']
-                return lib
-    return None
+    lib = get_registry_index().library(lib_name)
+    return lib["Path"] if lib is not None else None
 
 
 def is_supported_component_file(cls, component_file):
@@ -74,10 +30,42 @@ def get_plugin_info_from_file(cls, component_file):
     return reg_plugins.get_plugin_info_from_file(component_file)
 
 
+def get_plugin_infos_from_files(cls, component_files, known=None):
+    import csbenchlab.registry as reg_plugins
+    return reg_plugins.get_plugin_infos_from_files(component_files, known)
+
+
+def read_manifest_plugin_infos(cls, manifest_file):
+    """Return component path -> (source hashes, plugin info) of the components in a manifest."""
+    if not os.path.isfile(manifest_file):
+        return {}
+    try:
+        with open(manifest_file, 'r') as f:
+            manifest = json5.load(f)
+    except ValueError:
+        return {}
+    hashes = manifest.get('Hashes', {})
+    known = {}
+    for comps in manifest.get('Registry', {}).values():
+        for comp in (comps if isinstance(comps, list) else [comps]):
+            comp_path = comp.get('ComponentPath', None)
+            if comp_path in hashes:
+                known[comp_path] = (hashes[comp_path],
+                                    {k: v for k, v in comp.items() if k not in ['Lib', 'LibVersion']})
+    return known
+
+
 def get_supported_component_types(cls):
     return ['ctl', 'sys', 'est', 'dist']
 
 def get_plugin_info(cls, lib_name_or_path, component_name):
+    lib = get_registry_index().library(lib_name_or_path)
+    if lib is not None:
+        if not lib["HasManifest"]:
+            raise ValueError(f"Library at '{lib['Path']}' does not contain a valid manifest.json file")
+        return get_registry_index().plugin(lib["Entry"], component_name)
+
+    # libraries outside of the registry are not indexed
     if cls.is_valid_component_library(lib_name_or_path):
         lib_path = lib_name_or_path
     else:
@@ -121,35 +109,14 @@ def is_valid_component_library(cls, path):
 
 def list_component_libraries(cls, ignore_csbenchlab=True):
     libs = []
-    reg = get_app_registry_path()
-    fs = os.listdir(reg)
-
-    for n in fs:
-        # Skip '.' '..' 'slprj'
-        if n in ['.', '..', 'slprj']:
-            continue
-        full_path = os.path.join(reg, n)
-        if os.path.isdir(full_path):
-            if cls.is_valid_component_library(full_path):
-                info = cls.get_library_info(full_path, only_registered=True)
-                libs.append({
-                    "Name": info['Library'],
-                    "Type": "install",
-                    "Path": full_path,
-                    "Version": info['Version']
-                })
-        elif n.endswith('.json'):
-            with open(full_path, 'r') as f:
-                s = json.load(f)
-                lib = s['Path']
-                if os.path.isdir(lib) and cls.is_valid_component_library(lib):
-                    info = cls.get_library_info(lib, only_registered=True)
-                    libs.append({
-                        "Name": info['Library'],
-                        "Type": "link",
-                        "Path": lib,
-                        "Version": info['Version']
-                    })
+    for lib in get_registry_index().libraries():
+        if lib["Valid"]:
+            libs.append({
+                "Name": lib['Name'],
+                "Type": lib['Type'],
+                "Path": lib['Path'],
+                "Version": lib['Version']
+            })
     return libs
 
 def refresh_component_library(cls, lib_name):
@@ -168,6 +135,7 @@ def refresh_component_library(cls, lib_name):
         'Version': info['Version']
     }
 
+    comp_paths = []
     for plugin in plugins.get('Plugins', []):
         comp_path = os.path.join(path, plugin['Path'])
         if not os.path.isfile(comp_path):
@@ -176,14 +144,20 @@ def refresh_component_library(cls, lib_name):
         if not cls.is_supported_component_file(comp_path):
             warnings.warn(f"Component file '{comp_path}' is not a supported component file. Skipping.")
             continue
-        comp_info = cls.get_plugin_info_from_file(comp_path)
+        comp_paths.append(comp_path)
+
+    # components unchanged since the last refresh are taken from its manifest
+    manifest_file = os.path.join(path, 'autogen', 'manifest.json')
+    comp_infos, hashes = cls.get_plugin_infos_from_files(comp_paths, cls.read_manifest_plugin_infos(manifest_file))
+    for comp_info in comp_infos:
         comp_type = comp_info.get('T', 'unknown')
         if comp_type not in manifest['Registry']:
             manifest['Registry'][comp_type] = []
         manifest['Registry'][comp_type].append(comp_info)
-    manifest_file = os.path.join(path, 'autogen', 'manifest.json')
+    manifest['Hashes'] = hashes
     with open(manifest_file, 'w') as f:
         json.dump(manifest, f, indent=4)
+    get_registry_index().invalidate(path)
 
 def register_component_library(cls, path, link_register=False, ask_dialog=True):
     # copy files if not link register
@@ -347,6 +321,7 @@ def register_component(cls, info, lib_name, append_to_json=True, append_to_manif
 
         with open(manifest_file, 'w') as f:
             json.dump(manifest_data, f, indent=4)
+        get_registry_index().invalidate(lib_path)
 
 
 def unregister_component(cls, component_name, lib_name):
@@ -370,6 +345,7 @@ def unregister_component(cls, component_name, lib_name):
         raise ValueError(f"Component '{component_name}' not found in library '{lib_name}'")
     with open(manifest_file, 'w') as f:
         json.dump(manifest_data, f, indent=4)
+    get_registry_index().invalidate(lib_path)
 
     plugins_file = os.path.join(lib_path, 'plugins.json')
     with open(plugins_file, 'r') as f:
@@ -410,17 +386,21 @@ def make_component_registry_from_plugin_description(cls, plugin_path, lib_name,
         raise e
 
     lib_path = os.path.dirname(plugin_desc_path)
-    registry = {z : [] for z in cls.get_supported_component_types()}
+    comp_paths = []
     for p in pd.get('Plugins', []):
         if p['Type'] == 'folder_scan':
             scan_folder = os.path.join(lib_path, p['Path'])
             if not os.path.isdir(scan_folder):
                 warnings.warn(f"Plugin folder '{scan_folder} does not exist. Skipping...")
                 continue
-            registry = cls.detect_components_from_path(scan_folder, registry)
+            comp_paths.extend(_list_files(scan_folder))
         elif p['Type'] == 'file':
-            comp_path = os.path.join(lib_path, p['Path'])
-            registry = cls.detect_component(comp_path, registry)
+            comp_paths.append(os.path.join(lib_path, p['Path']))
+
+    known = {}
+    if save_manifest_library_path is not None:
+        known = cls.read_manifest_plugin_infos(os.path.join(save_manifest_library_path, 'manifest.json'))
+    registry, hashes = cls.detect_components(comp_paths, known=known)
 
     def append_lib_name_to_registry(registry, lib_name, version):
         for comps in registry.values():
@@ -435,7 +415,8 @@ def make_component_registry_from_plugin_description(cls, plugin_path, lib_name,
         manifest = {
             'Registry': registry,
             'Library': pkg['Library'],
-            'Version': pkg['Version']
+            'Version': pkg['Version'],
+            'Hashes': hashes
         }
         dir_name = os.path.dirname(save_manifest_library_path)
         if not os.path.exists(dir_name):
@@ -448,41 +429,38 @@ def make_component_registry_from_plugin_description(cls, plugin_path, lib_name,
 def detect_components_from_path(cls, path, registry=None):
     if registry is None:
         registry = {z : [] for z in cls.get_supported_component_types()}
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            comp_path = os.path.join(root, file)
-            registry = cls.detect_component(comp_path, registry)
+    registry, _ = cls.detect_components(_list_files(path), registry)
     return registry
 
 def detect_component(cls, component_file, registry=None):
+    registry, _ = cls.detect_components([component_file], registry)
+    return registry
+
+def detect_components(cls, component_files, registry=None, known=None):
     if registry is None:
         registry = {z : [] for z in cls.get_supported_component_types()}
-    if not os.path.isfile(component_file):
-        raise FileNotFoundError(f"Component file '{component_file}' not found.")
-    if not cls.is_supported_component_file(component_file):
-        warnings.warn(f"Component file '{component_file}' is not a supported component file. Skipping.")
-        return registry
-    comp_info = cls.get_plugin_info_from_file(component_file)
-    comp_type = comp_info.get('T', 'unknown')
-    if comp_type not in registry:
-        registry[comp_type] = []
-    registry[comp_type].append(comp_info)
-    return registry
+    comp_paths = []
+    for component_file in component_files:
+        if not os.path.isfile(component_file):
+            raise FileNotFoundError(f"Component file '{component_file}' not found.")
+        if not cls.is_supported_component_file(component_file):
+            warnings.warn(f"Component file '{component_file}' is not a supported component file. Skipping.")
+            continue
+        comp_paths.append(component_file)
+    comp_infos, hashes = cls.get_plugin_infos_from_files(comp_paths, known)
+    for comp_info in comp_infos:
+        comp_type = comp_info.get('T', 'unknown')
+        if comp_type not in registry:
+            registry[comp_type] = []
+        registry[comp_type].append(comp_info)
+    return registry, hashes
 
+def _list_files(path):
+    return [os.path.join(root, file) for root, dirs, files in os.walk(path) for file in files]
 
-def get_plugin_info_from_lib(cls, component_name, lib_name_or_path):
-    lib_path = cls.get_library_path(lib_name_or_path)
-    manifest_file = os.path.join(lib_path, 'autogen', 'manifest.json')
-    if not os.path.isfile(manifest_file):
-        raise ValueError(f"Library at '{lib_path}' does not contain a valid manifest.json file")
 
-    with open(manifest_file, 'r') as f:
-        plugins = json5.load(f)
-    registry = plugins.get('Registry', {})
-    for comp_type, comps in registry.items():
-        for comp in comps:
-            if comp['Name'] == component_name:
-                return comp
+def get_plugin_info_from_lib(cls, component_name, lib_name_or_path):
+    return cls.get_plugin_info(lib_name_or_path, component_name)
 
 def setup_library(cls, lib_name_or_path):
     pass
@@ -503,6 +481,8 @@ __all__ = ['get_library_path',
            'list_component_libraries',
            'get_plugin_info',
            'get_plugin_info_from_file',
+           'get_plugin_infos_from_files',
+           'read_manifest_plugin_infos',
            'get_plugin_info_from_lib',
            'is_supported_component_file',
            'get_available_plugins',
@@ -517,5 +497,6 @@ __all__ = ['get_library_path',
            'make_component_registry_from_plugin_description',
            'detect_components_from_path',
            'detect_component',
+           'detect_components',
            'setup_library'
 ]
\ No newline at end of file
@@ -0,0 +1,123 @@
+import hashlib, inspect, os, subprocess, sys, warnings
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+import numpy as np
+import scipy.sparse as sp
+import casadi as ca
+from csbenchlab.csb_app_setup import get_appdata_dir
+
+
+if sys.platform == 'win32':
+    LIBRARY_SUFFIX = '.dll'
+elif sys.platform == 'darwin':
+    LIBRARY_SUFFIX = '.dylib'
+else:
+    LIBRARY_SUFFIX = '.so'
+
+
+def get_codegen_cache_dir():
+    path = Path(get_appdata_dir()) / 'cache' / 'casadi'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _hash_value(h, value):
+    if isinstance(value, SimpleNamespace):
+        value = vars(value)
+    if isinstance(value, dict):
+        for k in sorted(value.keys(), key=str):
+            h.update(str(k).encode())
+            _hash_value(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for v in value:
+            _hash_value(h, v)
+        h.update(b']')
+    elif sp.issparse(value):
+        # the repr of a sparse matrix does not include its values
+        value = sp.csr_array(value, copy=True)
+        value.sum_duplicates()
+        h.update(str(value.shape).encode())
+        for a in (value.indptr, value.indices, value.data.astype(float)):
+            h.update(np.ascontiguousarray(a).tobytes())
+    elif isinstance(value, (np.ndarray, ca.DM)):
+        a = np.ascontiguousarray(np.asarray(value, dtype=float))
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    else:
+        h.update(repr(value).encode())
+
+
+def plugin_cache_key(plugin, *extra):
+    """
+    Return the codegen cache key of a plugin instance.
+
+    The key is a hash of the source files of the plugin class and its bases,
+    the plugin parameters, any extra values (e.g. dimensions) and the CasADi version.
+    """
+    h = hashlib.sha256()
+    h.update(ca.__version__.encode())
+    for cls in type(plugin).__mro__:
+        try:
+            source_file = inspect.getsourcefile(cls)
+        except TypeError:
+            # builtin classes
+            continue
+        if source_file is not None and os.path.exists(source_file):
+            with open(source_file, 'rb') as f:
+                h.update(f.read())
+    _hash_value(h, plugin.params)
+    for value in extra:
+        _hash_value(h, value)
+    return h.hexdigest()[:24]
+
+
+def library_path(name, key):
+    return get_codegen_cache_dir() / f"{name}_{key}{LIBRARY_SUFFIX}"
+
+
+def load_compiled_function(name, key):
+    """Load a compiled function from the codegen cache, or return None if it is not cached."""
+    path = library_path(name, key)
+    if not path.exists():
+        return None
+    return ca.external(name, str(path))
+
+
+def compile_function(fn, key):
+    """
+    Generate C code for a CasADi function, compile it into a shared library in
+    the codegen cache and load it with `ca.external`.
+
+    The compiler is taken from the 'CC' environment variable and defaults to 'gcc'.
+    If the function does not support code generation or compilation fails, a
+    warning is issued and the function is returned unchanged.
+    """
+    name = fn.name()
+    cached = load_compiled_function(name, key)
+    if cached is not None:
+        return cached
+
+    cache_dir = get_codegen_cache_dir()
+    # unique temporary names, so parallel workers can compile the same function
+    tmp_name = f"{name}_{key}_{uuid4().hex}"
+    c_file = cache_dir / f"{tmp_name}.c"
+    tmp_lib = cache_dir / f"{tmp_name}{LIBRARY_SUFFIX}"
+    compiler = os.environ.get('CC', 'gcc')
+    try:
+        cg = ca.CodeGenerator(f"{tmp_name}.c", {"with_header": False})
+        cg.add(fn)
+        cg.generate(str(cache_dir) + os.sep)
+        subprocess.run([compiler, '-O2', '-shared', '-fPIC', str(c_file), '-o', str(tmp_lib), '-lm'],
+                       check=True, capture_output=True)
+        os.replace(tmp_lib, library_path(name, key))
+    except (RuntimeError, OSError, subprocess.CalledProcessError) as e:
+        warnings.warn(f"Code generation of CasADi function '{name}' failed, " +
+                      f"using the interpreted function: {e}")
+        return fn
+    finally:
+        for f in (c_file, tmp_lib):
+            if f.exists():
+                f.unlink()
+    return ca.external(name, str(library_path(name, key)))
@@ -0,0 +1,182 @@
+import copy
+import os
+import casadi as ca
+import numpy as np
+
+
+class FusedStepFunction:
+    """
+    Chain of CasADi step functions composed into a single `ca.Function`.
+
+    The chain is evaluated symbolically once: every function takes its inputs
+    by name from the step inputs, the plugin data and the outputs of the previous
+    functions, and inputs that are not provided keep their default values.
+    The outputs of the fused function are the outputs of the last function.
+
+    When all inputs and outputs are dense, the function is evaluated through
+    `ca.Function.buffer` on preallocated NumPy arrays, which avoids building
+    `ca.DM` objects and dictionaries on every step.
+    """
+
+    def __init__(self, step_fns, input_names, data_names, name="fused_step"):
+        """
+        Args:
+            step_fns (list): CasADi functions called in order.
+            input_names (list): Names of the step inputs, in the order they are passed when called.
+            data_names (list): Names of the plugin data entries.
+            name (str): Name of the fused function.
+        """
+        symbols = {}
+        values = {}
+        outputs = []
+        for fn in step_fns:
+            args = []
+            for i, arg_name in enumerate(fn.name_in()):
+                if arg_name in values:
+                    args.append(values[arg_name])
+                elif arg_name in input_names or arg_name in data_names:
+                    sym = ca.MX.sym(arg_name, fn.sparsity_in(i))
+                    symbols[arg_name] = sym
+                    values[arg_name] = sym
+                    args.append(sym)
+                else:
+                    args.append(fn.default_in(i))
+            outputs = fn.call(args)
+            for out_name, out in zip(fn.name_out(), outputs):
+                values[out_name] = out
+
+        self.name_in = [n for n in list(input_names) + list(data_names) if n in symbols]
+        self.name_out = list(step_fns[-1].name_out())
+        self.function = ca.Function(name, [symbols[n] for n in self.name_in], outputs,
+                                    self.name_in, self.name_out)
+        # every argument is taken either from the step inputs or from the data
+        self._sources = [(True, list(input_names).index(n)) if n in input_names else (False, n)
+                         for n in self.name_in]
+        self._args = [None] * len(self.name_in)
+        self.set_function(self.function)
+
+    def set_function(self, function):
+        """Replace the fused function by an equivalent one, e.g. loaded from compiled code."""
+        self.function = function
+        self._eval = None
+        self._create_buffers()
+
+    def __deepcopy__(self, memo):
+        # the evaluation buffers hold raw pointers, so a copy gets its own buffers
+        result = copy.copy(self)
+        memo[id(self)] = result
+        result._args = [None] * len(self.name_in)
+        result.set_function(self.function)
+        return result
+
+    def _create_buffers(self):
+        f = self.function
+        dense = all(f.sparsity_in(i).is_dense() for i in range(f.n_in())) \
+            and all(f.sparsity_out(i).is_dense() for i in range(f.n_out()))
+        if not dense or not hasattr(f, 'buffer'):
+            return
+        self._buffer, self._eval = f.buffer()
+        self._in_buffers = [np.zeros(f.nnz_in(i)) for i in range(f.n_in())]
+        self._out_buffers = [np.zeros(f.nnz_out(i)) for i in range(f.n_out())]
+        self._out_shapes = [(f.size1_out(i), f.size2_out(i)) for i in range(f.n_out())]
+        for i, buf in enumerate(self._in_buffers):
+            self._buffer.set_arg(i, memoryview(buf))
+        for i, buf in enumerate(self._out_buffers):
+            self._buffer.set_res(i, memoryview(buf))
+
+    @staticmethod
+    def can_fuse(step_fns):
+        return isinstance(step_fns, (list, tuple)) and len(step_fns) > 0 \
+            and all(isinstance(fn, ca.Function) for fn in step_fns)
+
+    def index_out(self, name):
+        return self.name_out.index(name)
+
+    def __call__(self, inputs, data):
+        """
+        Evaluate the fused function.
+
+        Args:
+            inputs (tuple): Step input values, ordered as `input_names`.
+            data (CasadiDict): Plugin data.
+        Returns:
+            list: Output values as 2D NumPy arrays, ordered as `name_out`.
+        """
+        if self._eval is None:
+            args = self._args
+            for i, (is_input, source) in enumerate(self._sources):
+                args[i] = inputs[source] if is_input else getattr(data, source)
+            return [out.full() for out in self.function.call(args)]
+
+        # CasADi stores dense matrices column by column
+        for buf, (is_input, source) in zip(self._in_buffers, self._sources):
+            value = inputs[source] if is_input else getattr(data, source)
+            if isinstance(value, ca.DM):
+                value = value.full()
+            buf[:] = np.ravel(value, order='F')
+        self._eval()
+        return [buf.reshape(shape, order='F').copy() for buf, shape in zip(self._out_buffers, self._out_shapes)]
+
+
+class MappedStepFunction:
+    """
+    Step function of N plugin instances evaluated in one call with `ca.Function.map`.
+
+    Every input and output of the mapped function is a matrix with one column
+    per instance. Inputs are broadcast, so values shared by all instances
+    (e.g. the time) can be passed once.
+    """
+
+    def __init__(self, function, n, parallelization="thread", max_workers=None):
+        """
+        Args:
+            function (ca.Function): Step function of a single instance.
+            n (int): Number of instances.
+            parallelization (str): 'serial', 'unroll', 'openmp' or 'thread'.
+            max_workers (int): Number of threads with 'thread' parallelization,
+                defaults to the number of CPUs.
+        """
+        self.n = n
+        if parallelization == "thread":
+            workers = max_workers or min(n, os.cpu_count() or 1)
+            self.function = function.map(n, "thread", workers)
+        else:
+            self.function = function.map(n, parallelization)
+        self._create_buffers()
+
+    def __deepcopy__(self, memo):
+        # the evaluation buffers hold raw pointers, so a copy gets its own buffers
+        result = copy.copy(self)
+        memo[id(self)] = result
+        result._create_buffers()
+        return result
+
+    def _create_buffers(self):
+        f = self.function
+        self._buffer, self._eval = f.buffer()
+        self._in_buffers = [np.zeros(f.nnz_in(i)) for i in range(f.n_in())]
+        self._in_shapes = [(f.size1_in(i), f.size2_in(i)) for i in range(f.n_in())]
+        self._out_buffers = [np.zeros(f.nnz_out(i)) for i in range(f.n_out())]
+        self._out_shapes = [(f.size1_out(i), f.size2_out(i)) for i in range(f.n_out())]
+        for i, buf in enumerate(self._in_buffers):
+            self._buffer.set_arg(i, memoryview(buf))
+        for i, buf in enumerate(self._out_buffers):
+            self._buffer.set_res(i, memoryview(buf))
+
+    def __call__(self, *args):
+        """
+        Evaluate all instances.
+
+        Args:
+            args: Input matrices with one column per instance, or values
+                broadcast to all instances.
+        Returns:
+            list: Output matrices with one column per instance.
+        """
+        for buf, shape, value in zip(self._in_buffers, self._in_shapes, args):
+            value = np.asarray(value, dtype=float)
+            if value.shape != shape:
+                value = np.broadcast_to(value.reshape((-1, 1)) if value.ndim < 2 else value, shape)
+            buf[:] = value.ravel(order='F')
+        self._eval()
+        return [buf.reshape(shape, order='F').copy() for buf, shape in zip(self._out_buffers, self._out_shapes)]
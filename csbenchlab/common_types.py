@@ -9,7 +9,8 @@ class ScenarioOptions():
                  system_parameter_overrides={},
                  disturbance_parameter_overrides={},
                  num_evaluations=1,
-                 random_seed=42
+                 random_seed=42,
+                 reference_interpolation="hold"
                  ):
         self.data = {
             "SystemIc": ic,
@@ -17,7 +18,8 @@ class ScenarioOptions():
             "Reference": reference,
             "DisturbanceParameterOverrides": disturbance_parameter_overrides,
             "NumEvaluations": num_evaluations,
-            "RandomSeed": random_seed
+            "RandomSeed": random_seed,
+            "ReferenceInterpolation": reference_interpolation
         }
 
 class PyFunctionHandle(str):
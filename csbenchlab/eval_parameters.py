@@ -3,7 +3,9 @@ from csbenchlab.data_desc import get_component_param_file_path
 from csbenchlab.plugin_helpers import import_module_from_path
 from pathlib import Path
 from types import SimpleNamespace
+import scipy.sparse as sp
 import warnings
+import copy
 
 __cache_results = {}
 
@@ -25,6 +27,18 @@ def handle_callable_value_(value, info, params, plugin_class=None):
             return info["DefaultValue"](params)
     return value
 
+def handle_default_value_(info, params, plugin_class=None):
+    default = info["DefaultValue"]
+    if callable(default) or (isinstance(default, str) and default in ["csb_py_fh", "csb_m_fh"]):
+        return handle_callable_value_(None, info, params, plugin_class)
+    return handle_sparse_value_(copy.deepcopy(default))
+
+def handle_sparse_value_(value):
+    # sparse matrices stay sparse, in the CSR format suited to matrix-vector products
+    if sp.issparse(value) and not isinstance(value, sp.csr_array):
+        return sp.csr_array(value)
+    return value
+
 def load_param_description_class_from_file_(file_path, plugin_name):
     global __cache_results
     cache_key = file_path
@@ -73,10 +87,15 @@ def eval_plugin_params_from_file(param_file, param_desc, plugin_class=None, plug
 
     for info in param_desc:
         if hasattr(params_cls, info['Name']):
-            value = getattr(params_cls, info['Name'])
+            # the parameter file module is cached, so its values are copied
+            value = copy.deepcopy(getattr(params_cls, info['Name']))
             value = handle_callable_value_(value, info, result_params, plugin_class)
+            value = handle_sparse_value_(value)
         else:
-            raise ValueError(f"Parameter '{info['Name']}' not found in 'ComponentParams' class.\n  Param file: '{param_file}'")
+            # parameters added to a plugin after its parameter file was written take their defaults
+            value = handle_default_value_(info, result_params, plugin_class)
+            warnings.warn(f"Parameter '{info['Name']}' not found in 'ComponentParams' class, " +
+                          f"using its default value.\n  Param file: '{param_file}'")
         setattr(result_params, info['Name'], value)
     return result_params
 
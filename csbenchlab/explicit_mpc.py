@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class ExplicitQPLaw:
+    """
+    Explicit solution of the box constrained parametric QP
+
+        min_U 0.5 U' H U + (F p)' U   s.t.   lb <= U <= ub
+
+    over a bounded region of the parameter p.
+
+    The solution is piecewise affine in p, with one affine law per active set.
+    The laws are computed offline from QP solutions on a grid over the region,
+    and every grid vertex stores the index of the law valid at it. At run time
+    the grid cell of p is located by binary search along every axis, and the
+    laws of the cell vertices are tried until one satisfies the optimality
+    conditions at p. If none does, or p is outside the region, `lookup` returns
+    None and the QP has to be solved online.
+    """
+
+    def __init__(self, H, F, lb, ub, axes, vertex_law, active_sets, tol=1e-7):
+        """
+        Args:
+            H (np.ndarray): Hessian of the QP, (n, n).
+            F (np.ndarray): Linear term as a function of the parameter, (n, np).
+            lb (np.ndarray): Lower bounds of U, (n,).
+            ub (np.ndarray): Upper bounds of U, (n,).
+            axes (list): Grid points along every parameter dimension.
+            vertex_law (np.ndarray): Index of the law valid at every grid vertex.
+            active_sets (np.ndarray): Active set of every law, (nr, n) with -1 for
+                the lower bound, 1 for the upper bound and 0 for free variables.
+            tol (float): Tolerance of the optimality checks.
+        """
+        self.H = np.asarray(H, dtype=float)
+        self.F = np.asarray(F, dtype=float)
+        self.lb = np.asarray(lb, dtype=float)
+        self.ub = np.asarray(ub, dtype=float)
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        self.vertex_law = np.asarray(vertex_law, dtype=np.int64)
+        self.active_sets = np.asarray(active_sets, dtype=np.int8).reshape(-1, len(self.lb))
+        self.tol = tol
+        laws = [self.active_set_law(a) for a in self.active_sets]
+        self.K = np.array([K for K, _ in laws]).reshape(-1, *self.F.shape)
+        self.k = np.array([k for _, k in laws]).reshape(-1, len(self.lb))
+        # offsets of the 2^d vertices of a grid cell
+        self._corners = np.array(np.meshgrid(*[[0, 1]] * len(self.axes), indexing='ij')).reshape(len(self.axes), -1).T
+
+    @property
+    def num_laws(self):
+        return len(self.active_sets)
+
+    def active_set_law(self, active):
+        """
+        Return K, k of the affine law U = K p + k of an active set.
+
+        Variables in the active set are fixed at their bounds and the remaining
+        ones minimize the cost with the fixed ones given.
+        """
+        active = np.asarray(active)
+        n, n_p = self.F.shape
+        K = np.zeros((n, n_p))
+        k = np.zeros(n)
+        fixed = active != 0
+        free = ~fixed
+        k[active < 0] = self.lb[active < 0]
+        k[active > 0] = self.ub[active > 0]
+        if np.any(free):
+            H_ff = self.H[np.ix_(free, free)]
+            H_fa = self.H[np.ix_(free, fixed)]
+            K[free] = -np.linalg.solve(H_ff, self.F[free])
+            k[free] = -np.linalg.solve(H_ff, H_fa @ k[fixed])
+        return K, k
+
+    def active_set(self, U, p):
+        """Return the active set of a solution U at parameter p."""
+        U = np.ravel(U)
+        grad = self.H @ U + self.F @ np.ravel(p)
+        scale = self.tol * (1 + np.abs(U))
+        active = np.zeros(len(U), dtype=np.int8)
+        active[(U <= self.lb + scale) & (grad > 0)] = -1
+        active[(U >= self.ub - scale) & (grad < 0)] = 1
+        return active
+
+    def is_optimal(self, law, U, p):
+        """Check the primal and dual feasibility of U, given by law `law`, at p."""
+        active = self.active_sets[law]
+        scale = self.tol * (1 + np.abs(U))
+        free = active == 0
+        if np.any(U[free] < self.lb[free] - scale[free]) or np.any(U[free] > self.ub[free] + scale[free]):
+            return False
+        grad = self.H @ U + self.F @ p
+        g_scale = self.tol * (1 + np.abs(grad))
+        return not (np.any(grad[active < 0] < -g_scale[active < 0]) or np.any(grad[active > 0] > g_scale[active > 0]))
+
+    def lookup(self, p):
+        """Return the optimal U at p, or None if it is not covered by the stored laws."""
+        p = np.ravel(p)
+        cell = np.empty(len(self.axes), dtype=np.int64)
+        for i, axis in enumerate(self.axes):
+            if p[i] < axis[0] or p[i] > axis[-1]:
+                return None
+            cell[i] = min(np.searchsorted(axis, p[i], side='right') - 1, len(axis) - 2)
+        tried = set()
+        for offset in self._corners:
+            law = int(self.vertex_law[tuple(cell + offset)])
+            if law < 0 or law in tried:
+                continue
+            tried.add(law)
+            U = self.K[law] @ p + self.k[law]
+            if self.is_optimal(law, U, p):
+                return U
+        return None
+
+    @classmethod
+    def from_grid(cls, H, F, lb, ub, axes, solve, tol=1e-7):
+        """
+        Compute the explicit law from QP solutions at every vertex of a grid.
+
+        Args:
+            H, F, lb, ub: The parametric QP, see `__init__`.
+            axes (list): Grid points along every parameter dimension.
+            solve (callable): Returns the optimal U for a parameter p, or None
+                if the QP could not be solved.
+        Returns:
+            ExplicitQPLaw
+        """
+        law = cls(H, F, lb, ub, axes, np.full([len(a) for a in axes], -1), np.zeros((0, len(lb))), tol)
+        index = {}
+        for vertex in np.ndindex(*law.vertex_law.shape):
+            p = np.array([law.axes[i][j] for i, j in enumerate(vertex)])
+            U = solve(p)
+            if U is None:
+                continue
+            active = law.active_set(U, p)
+            key = active.tobytes()
+            if key not in index:
+                index[key] = len(index)
+            law.vertex_law[vertex] = index[key]
+        active_sets = [np.frombuffer(key, dtype=np.int8) for key in index]
+        return cls(H, F, lb, ub, axes, law.vertex_law, np.array(active_sets).reshape(-1, len(lb)), tol)
+
+    def save(self, path):
+        np.savez(path, H=self.H, F=self.F, lb=self.lb, ub=self.ub, vertex_law=self.vertex_law,
+                 active_sets=self.active_sets, tol=self.tol,
+                 **{f"axis_{i}": a for i, a in enumerate(self.axes)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            axes = [f[f"axis_{i}"] for i in range(f["vertex_law"].ndim)]
+            return cls(f["H"], f["F"], f["lb"], f["ub"], axes, f["vertex_law"], f["active_sets"], float(f["tol"]))
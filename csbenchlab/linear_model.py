@@ -0,0 +1,167 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+def _matrix(value):
+    # sparse matrices are kept sparse
+    if sp.issparse(value):
+        return sp.csr_array(value, dtype=float)
+    return np.atleast_2d(np.asarray(value, dtype=float))
+
+
+def _dense(value):
+    return value.toarray() if sp.issparse(value) else value
+
+
+class LinearModel:
+    """
+    Discrete-time linear model of a plugin step.
+
+    A step with input w moves the plugin state s to A s + B w and returns
+    C s + D w. The plugin saturates its output to [out_min, out_max], where the
+    model is no longer valid. The matrices may be scipy.sparse matrices.
+    """
+
+    def __init__(self, A, B, C, D, x0=None, out_min=-np.inf, out_max=np.inf, set_state=None):
+        """
+        Args:
+            A, B, C, D (np.ndarray): Model matrices.
+            x0 (np.ndarray): Current state of the plugin.
+            out_min, out_max: Saturation limits of the output.
+            set_state (callable): Stores a model state in the plugin, called
+                after a run with the model.
+        """
+        self.A = _matrix(A)
+        self.B = _matrix(B)
+        self.C = _matrix(C)
+        self.D = _matrix(D)
+        self.x0 = np.zeros(self.A.shape[0]) if x0 is None else np.asarray(x0, dtype=float).ravel()
+        self.out_min = np.broadcast_to(np.asarray(out_min, dtype=float), (self.C.shape[0],))
+        self.out_max = np.broadcast_to(np.asarray(out_max, dtype=float), (self.C.shape[0],))
+        self.set_state = set_state
+
+    @classmethod
+    def static(cls, D, out_min=-np.inf, out_max=np.inf):
+        """Model of a step without state, returning D w."""
+        D = np.atleast_2d(np.asarray(D, dtype=float))
+        return cls(np.zeros((0, 0)), np.zeros((0, D.shape[1])), np.zeros((D.shape[0], 0)), D,
+                   out_min=out_min, out_max=out_max)
+
+    @property
+    def num_states(self):
+        return self.A.shape[0]
+
+    @property
+    def num_inputs(self):
+        return self.B.shape[1]
+
+    @property
+    def num_outputs(self):
+        return self.C.shape[0]
+
+    def is_saturated(self, y):
+        """Check if any of the outputs y, one per row, is outside the saturation limits."""
+        return bool(np.any(y < self.out_min) or np.any(y > self.out_max))
+
+
+class ClosedLoopModel:
+    """
+    Linear model of a Reference -> Controller -> Plant -> Noise -> Controller loop
+    as stepped by `ControlEnvironment.run_native`.
+
+    Every block is stepped with the outputs of the previous sample, so the loop
+    state is z = [s_c; s_p; s_n; u; y; y_n], where s are the block states and
+    u, y, y_n the last block outputs, and z' = M z + N r with the reference r.
+    M is sparse if any block model is sparse.
+    """
+
+    def __init__(self, controller, plant, noise):
+        """
+        Args:
+            controller (LinearModel): Model with input [y_ref; y_n] and output u.
+            plant (LinearModel): Model with input u and output y.
+            noise (LinearModel): Model with input y and output y_n.
+        """
+        self.controller = controller
+        self.plant = plant
+        self.noise = noise
+        nu, ny, nyn = plant.num_inputs, plant.num_outputs, noise.num_outputs
+        n_ref = controller.num_inputs - nyn
+        if controller.num_outputs != nu or noise.num_inputs != ny or n_ref < 0:
+            raise ValueError("Dimensions of the controller, plant and noise models do not match.")
+
+        sizes = [controller.num_states, plant.num_states, noise.num_states, nu, ny, nyn]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self._slices = [slice(offsets[i], offsets[i + 1]) for i in range(len(sizes))]
+        sc, s_p, sn, su, sy, syn = self._slices
+        n = offsets[-1]
+        is_sparse = any(sp.issparse(m) for model in (controller, plant, noise)
+                        for m in (model.A, model.B, model.C, model.D))
+        N = np.zeros((n, n_ref))
+        Bc_r, Bc_y = controller.B[:, :n_ref], controller.B[:, n_ref:]
+        Dc_r, Dc_y = controller.D[:, :n_ref], controller.D[:, n_ref:]
+        blocks = [
+            # controller, driven by the reference and the disturbed output
+            (sc, sc, controller.A), (sc, syn, Bc_y), (su, sc, controller.C), (su, syn, Dc_y),
+            # plant, driven by the last control input
+            (s_p, s_p, plant.A), (s_p, su, plant.B), (sy, s_p, plant.C), (sy, su, plant.D),
+            # noise, driven by the last plant output
+            (sn, sn, noise.A), (sn, sy, noise.B), (syn, sn, noise.C), (syn, sy, noise.D),
+        ]
+        if is_sparse:
+            # the nonzeros of all blocks are shifted to their position in M
+            coo = [(sp.coo_array(block), rows.start, cols.start) for rows, cols, block in blocks]
+            self.M = sp.csr_array((np.concatenate([b.data for b, _, _ in coo]),
+                                   (np.concatenate([b.row + r for b, r, _ in coo]),
+                                    np.concatenate([b.col + c for b, _, c in coo]))), shape=(n, n))
+        else:
+            self.M = np.zeros((n, n))
+            for rows, cols, block in blocks:
+                self.M[rows, cols] = block
+        N[sc] = _dense(Bc_r)
+        N[su] = _dense(Dc_r)
+        self.N = N
+
+    def initial_state(self, u, y, y_n):
+        return np.concatenate([self.controller.x0, self.plant.x0, self.noise.x0,
+                               np.ravel(u), np.ravel(y), np.ravel(y_n)])
+
+    def simulate(self, z0, refs):
+        """
+        Simulate the loop from z0 with the reference samples refs.
+
+        Returns:
+            np.ndarray: The loop state at every sample, (n + 1, n_z). Row k is the
+                state before the blocks are stepped with refs[k].
+        """
+        n = len(refs)
+        Z = np.empty((n + 1, len(z0)))
+        Z[0] = z0
+        # the reference contribution is computed for all samples at once
+        R = np.asarray(refs, dtype=float).reshape(n, -1) @ self.N.T
+        M = self.M
+        z = Z[0]
+        for k in range(n):
+            z = M @ z + R[k]
+            Z[k + 1] = z
+        return Z
+
+    def split(self, Z):
+        """Return the (s_c, s_p, s_n, u, y, y_n) parts of loop states, one per row."""
+        return [Z[:, s] for s in self._slices]
+
+    def is_saturated(self, Z):
+        """Check if any block output computed by the model is outside its saturation limits."""
+        _, _, _, u, y, y_n = self.split(Z[1:])
+        return self.controller.is_saturated(u) or self.plant.is_saturated(y) or self.noise.is_saturated(y_n)
+
+    def store_state(self, z):
+        """
+        Store the block states of the loop state z in the blocks with a `set_state`
+        callback and return the last block outputs (u, y, y_n).
+        """
+        s_c, s_p, s_n, u, y, y_n = [z[s] for s in self._slices]
+        for model, s in ((self.controller, s_c), (self.plant, s_p), (self.noise, s_n)):
+            if model.set_state is not None:
+                model.set_state(s)
+        return u, y, y_n
@@ -0,0 +1,168 @@
+import itertools
+import numpy as np
+from csbenchlab.common_types import MultiScenario
+
+
+OVERRIDE_GROUPS = {
+    "SystemParameterOverrides": "System",
+    "DisturbanceParameterOverrides": "Disturbance",
+}
+
+GENERATORS = ["cartesian", "random", "lhs", "sobol"]
+
+
+def _iterate_params(params):
+    for group, prefix in OVERRIDE_GROUPS.items():
+        for name, spec in params.get(group, {}).items():
+            yield group, name, f"{prefix}.{name}", spec
+    unknown = set(params.keys()) - set(OVERRIDE_GROUPS.keys())
+    if unknown:
+        raise ValueError(f"Unknown MultiScenario parameter groups {sorted(unknown)}. " +
+                         f"Supported groups: {list(OVERRIDE_GROUPS.keys())}")
+
+
+def _empty_point():
+    return {group: {} for group in OVERRIDE_GROUPS}
+
+
+def cartesian_points(params):
+    """
+    Expand lists of values into their Cartesian product.
+
+    Args:
+        params (dict): Maps 'SystemParameterOverrides' and 'DisturbanceParameterOverrides'
+            to dictionaries of parameter name -> list of values.
+    Returns:
+        list: Parameter override points.
+    """
+    entries = list(_iterate_params(params))
+    points = []
+    for values in itertools.product(*[spec for _, _, _, spec in entries]):
+        point = _empty_point()
+        for (group, name, _, _), value in zip(entries, values):
+            point[group][name] = value
+        points.append(point)
+    return points
+
+
+def sampled_points(params, num_samples, generator="lhs", random_seed=None):
+    """
+    Sample parameter sets from box ranges.
+
+    Args:
+        params (dict): Maps 'SystemParameterOverrides' and 'DisturbanceParameterOverrides'
+            to dictionaries of parameter name -> (low, high). Bounds can be scalars or arrays.
+        num_samples (int): Number of points to generate.
+        generator (str): 'random', 'lhs' (Latin hypercube) or 'sobol'.
+        random_seed (int): Seed of the sampler.
+    Returns:
+        list: Parameter override points.
+    """
+    from scipy.stats import qmc
+
+    entries = []
+    for group, name, _, spec in _iterate_params(params):
+        if len(spec) != 2:
+            raise ValueError(f"Sampled parameter '{name}' must be given as (low, high).")
+        low = np.asarray(spec[0], dtype=float)
+        high = np.broadcast_to(np.asarray(spec[1], dtype=float), low.shape)
+        entries.append((group, name, low, high))
+    dim = sum(max(low.size, 1) for _, _, low, _ in entries)
+    if dim == 0:
+        return []
+
+    if generator == "random":
+        unit = np.random.default_rng(random_seed).random((num_samples, dim))
+    elif generator == "lhs":
+        unit = qmc.LatinHypercube(d=dim, seed=random_seed).random(num_samples)
+    elif generator == "sobol":
+        unit = qmc.Sobol(d=dim, scramble=True, seed=random_seed).random(num_samples)
+    else:
+        raise ValueError(f"Unknown sampling generator '{generator}'. Available generators: {GENERATORS}")
+
+    points = []
+    for row in unit:
+        point = _empty_point()
+        col = 0
+        for group, name, low, high in entries:
+            size = max(low.size, 1)
+            u = row[col:col + size].reshape(low.shape)
+            value = low + u * (high - low)
+            point[group][name] = float(value) if low.ndim == 0 else value
+            col += size
+        points.append(point)
+    return points
+
+
+def expand_multi_scenario(multi_scenario: MultiScenario):
+    """
+    Expand a `MultiScenario` into a list of parameter override points.
+
+    Each point is a dictionary with 'SystemParameterOverrides' and
+    'DisturbanceParameterOverrides' entries, ready to be merged into a scenario.
+    The generator can be one of 'cartesian' (default), 'random', 'lhs', 'sobol'
+    or a callable `generator(params, num_samples, random_seed)` returning such points.
+    """
+    params = multi_scenario.params or {}
+    generator = multi_scenario.generator
+    if generator is None:
+        generator = "cartesian"
+    if callable(generator):
+        return list(generator(params, multi_scenario.num_samples, multi_scenario.random_seed))
+    if generator == "cartesian":
+        points = cartesian_points(params)
+        if multi_scenario.num_samples:
+            points = points[:multi_scenario.num_samples]
+        return points
+    return sampled_points(params, multi_scenario.num_samples, generator, multi_scenario.random_seed)
+
+
+def flatten_point(point):
+    """Return the point as a flat dictionary with 'System.<name>' and 'Disturbance.<name>' keys."""
+    flat = {}
+    for group, prefix in OVERRIDE_GROUPS.items():
+        for name, value in point.get(group, {}).items():
+            flat[f"{prefix}.{name}"] = value
+    return flat
+
+
+class SweepResultTable:
+    """
+    Columnar table of parameter sweep results.
+
+    Rows are appended as they arrive and every column is stored as a list until
+    it is requested, when it is converted to a NumPy array.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self._num_rows = 0
+
+    def __len__(self):
+        return self._num_rows
+
+    def __getitem__(self, name):
+        return np.asarray(self.columns[name])
+
+    def keys(self):
+        return self.columns.keys()
+
+    def append(self, row: dict):
+        for name in row.keys():
+            if name not in self.columns:
+                # columns appearing later are padded for the previous rows
+                self.columns[name] = [None] * self._num_rows
+        for name, column in self.columns.items():
+            column.append(row.get(name, None))
+        self._num_rows += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def as_arrays(self):
+        return {name: self[name] for name in self.columns}
+
+    def save(self, path):
+        """Save the table as a compressed '.npz' file with one array per column."""
+        np.savez_compressed(path, **self.as_arrays())
@@ -0,0 +1,85 @@
+import numpy as np
+from scipy.signal import sosfilt
+
+
+class NoiseStream:
+    """
+    Noise samples drawn from a random generator in blocks.
+
+    Drawing a block of samples with one generator call is much cheaper than
+    drawing every sample separately. For the NumPy distributions a block gives
+    the same samples as drawing them one by one, so the noise does not depend
+    on the block size.
+    """
+
+    def __init__(self, draw, rng, block_size=4096):
+        """
+        Args:
+            draw (callable): draw(rng, n) returns n noise samples, one per row.
+            rng (np.random.Generator): Generator the samples are drawn from.
+            block_size (int): Number of samples drawn at once when the stream runs out.
+        """
+        self.draw = draw
+        self.rng = rng
+        self.block_size = block_size
+        self._samples = None
+        self._index = 0
+        self._size = 0
+
+    @property
+    def available(self):
+        return self._size - self._index
+
+    def reserve(self, n):
+        """Draw samples so at least n of them are available, e.g. for a whole run."""
+        missing = n - self.available
+        if missing <= 0:
+            return
+        block = self.draw(self.rng, missing)
+        if self.available > 0:
+            block = np.concatenate([self._samples[self._index:], block])
+        self._samples = block
+        self._index = 0
+        self._size = len(block)
+
+    def take(self, n):
+        """Return the next n samples, one per row."""
+        if self.available < n:
+            self.reserve(max(n, self.block_size))
+        samples = self._samples[self._index:self._index + n]
+        self._index += n
+        return samples
+
+    def next(self):
+        """Return the next sample."""
+        if self._index >= self._size:
+            self.reserve(self.block_size)
+        sample = self._samples[self._index]
+        self._index += 1
+        return sample
+
+
+class FilteredNoise:
+    """
+    Draw function of a `NoiseStream` giving white Gaussian noise filtered by an
+    IIR filter in second-order sections.
+
+    Every block is filtered with one `scipy.signal.sosfilt` call. The filter state
+    is kept between blocks, so the noise does not depend on the block size.
+    """
+
+    def __init__(self, sos, num_outputs, mean=0.0):
+        """
+        Args:
+            sos (np.ndarray): Filter sections, (n_sections, 6).
+            num_outputs (int): Number of independent noise channels.
+            mean (float): Offset added to the filtered noise.
+        """
+        self.sos = np.atleast_2d(np.asarray(sos, dtype=float))
+        self.mean = mean
+        self.zi = np.zeros((len(self.sos), 2, num_outputs))
+
+    def __call__(self, rng, n):
+        white = rng.standard_normal((n, self.zi.shape[2]))
+        filtered, self.zi = sosfilt(self.sos, white, axis=0, zi=self.zi)
+        return filtered + self.mean
@@ -6,12 +6,16 @@ from . import PluginBase, Controller
 import numpy as np
 import casadi as ca
 from csbenchlab.casadi_dict import CasadiDict
+from csbenchlab.casadi_step_function import FusedStepFunction
+from csbenchlab.casadi_codegen import plugin_cache_key, load_compiled_function, compile_function
 
 
 class CasadiController(Controller):
 
     casadi_plugin__ = True
     is_pure__ = True
+    # compile the fused step function to C, enabled with the 'codegen' keyword argument
+    codegen = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -21,9 +25,7 @@ class CasadiController(Controller):
         else:
             self.data_as_casadi = CasadiDict({})
 
-        # Overload casadi functions
-        self.casadi_configure()
-        self.step_fns = self.casadi_step_fn_()
+        self.build_step_function()
 
     @abstractmethod
     def casadi_step_fn(self):
@@ -38,6 +40,52 @@ class CasadiController(Controller):
     def casadi_step_fn_(self):
         return self.casadi_step_fn()
 
+    def build_step_function(self):
+        """
+        Build the step functions and fuse them into `step_function`.
+
+        With `codegen` enabled, the fused function is compiled to a shared library
+        cached under the app data directory. `casadi_configure` is always called,
+        so the state it sets is available either way. When the library for the plugin
+        source and parameters is already cached, it is loaded directly and
+        `casadi_step_fn` is not called. Subclasses with their own `on_step` do not
+        use the fused function, so it is not compiled for them.
+        """
+        # Overload casadi functions
+        self.casadi_configure()
+        key = None
+        if self.codegen and type(self).on_step is CasadiController.on_step:
+            key = plugin_cache_key(self, self.mux)
+            compiled = load_compiled_function(self.step_function_name(), key)
+            if compiled is not None:
+                self.step_fns = [compiled]
+                self.step_function = self.fuse_step_fns()
+                if self.step_function is not None:
+                    self.step_function.set_function(compiled)
+                return
+        self.step_fns = self.casadi_step_fn_()
+        self.step_function = self.fuse_step_fns()
+        if key is not None and self.step_function is not None:
+            self.step_function.set_function(compile_function(self.step_function.function, key))
+
+    def step_function_name(self):
+        return f"{type(self).__name__}_step"
+
+    def fuse_step_fns(self):
+        """
+        Compose `step_fns` into a single `FusedStepFunction` with the 'u' output.
+        Returns None if the chain cannot be fused, in which case the step functions
+        are called one by one.
+        """
+        if not FusedStepFunction.can_fuse(self.step_fns):
+            return None
+        fused = FusedStepFunction(self.step_fns, ['y_ref', 'y', 'dt'], list(self.data_as_casadi.keys),
+                                  name=self.step_function_name())
+        if 'u' not in fused.name_out:
+            return None
+        self._u_index = fused.index_out('u')
+        return fused
+
     @classmethod
     def create_data_model(cls, params, mux):
         """Create and return a data model for the controller."""
@@ -55,6 +103,9 @@ class CasadiController(Controller):
     def on_step(self, y_ref, y, dt, data=None, *args, **kwargs):
         if data is None:
             data = self.data_as_casadi
+        if self.step_function is not None:
+            out = self.step_function((y_ref, y, dt), data)
+            return out[self._u_index][:, 0]
         d = {
             'y_ref': y_ref,
             'y': y,
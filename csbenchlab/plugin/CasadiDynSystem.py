@@ -3,6 +3,8 @@ from abc import abstractmethod
 from . import DynSystem
 import numpy as np
 from csbenchlab.casadi_dict import CasadiDict
+from csbenchlab.casadi_step_function import FusedStepFunction, MappedStepFunction
+from csbenchlab.casadi_codegen import plugin_cache_key, load_compiled_function, compile_function
 from csbenchlab.descriptor import DataModel
 import casadi as ca
 
@@ -11,6 +13,8 @@ class CasadiDynSystem(DynSystem):
 
     casadi_plugin__ = True
     is_pure__ = True
+    # compile the step functions to C, enabled with the 'codegen' keyword argument
+    codegen = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -20,9 +24,7 @@ class CasadiDynSystem(DynSystem):
         else:
             self.data_as_casadi = CasadiDict({})
 
-        # Overload casadi functions
-        self.casadi_configure()
-        self.step_fns = self.casadi_step_fn_()
+        self.build_step_function()
 
     @abstractmethod
     def casadi_step_fn(self):
@@ -37,6 +39,101 @@ class CasadiDynSystem(DynSystem):
     def casadi_step_fn_(self):
         return self.casadi_step_fn()
 
+    def build_step_function(self):
+        """
+        Build the step functions and fuse them into `step_function`.
+
+        With `codegen` enabled, the fused function is compiled to a shared library
+        cached under the app data directory. `casadi_configure` is always called,
+        so the state it sets is available either way. When the library for the plugin
+        source and parameters is already cached, it is loaded directly and
+        `casadi_step_fn` is not called. Subclasses with their own `on_step` do not
+        use the fused function, so it is not compiled for them.
+        """
+        # Overload casadi functions
+        self.casadi_configure()
+        key = None
+        if self.codegen and type(self).on_step is CasadiDynSystem.on_step:
+            key = plugin_cache_key(self)
+            compiled = load_compiled_function(self.step_function_name(), key)
+            if compiled is not None:
+                self.step_fns = [compiled]
+                self.step_function = self.fuse_step_fns()
+                if self.step_function is not None:
+                    self.step_function.set_function(compiled)
+                return
+        self.step_fns = self.casadi_step_fn_()
+        self.step_function = self.fuse_step_fns()
+        if key is not None and self.step_function is not None:
+            self.step_function.set_function(compile_function(self.step_function.function, key))
+
+    def step_function_name(self):
+        return f"{type(self).__name__}_step"
+
+    def fuse_step_fns(self):
+        """
+        Compose `step_fns` into a single `FusedStepFunction` with the 'dx' output.
+        Returns None if the chain cannot be fused, in which case the step functions
+        are called one by one.
+        """
+        if not FusedStepFunction.can_fuse(self.step_fns):
+            return None
+        fused = FusedStepFunction(self.step_fns, ['u', 't', 'dt'], list(self.data_as_casadi.keys),
+                                  name=self.step_function_name())
+        if 'dx' not in fused.name_out:
+            return None
+        self._dx_index = fused.index_out('dx')
+        return fused
+
+    def transition_function(self):
+        """
+        Return the function (x, u, t, dt) -> (x_next, y) of one step, where y is the
+        value returned by `on_step`.
+
+        Returns None if the step cannot be written as such a function, i.e. when
+        `on_step` is overridden, the step functions are not fused or the plugin data
+        holds more than the state 'x'.
+        """
+        if type(self).on_step is not CasadiDynSystem.on_step or self.step_function is None:
+            return None
+        fused = self.step_function
+        if set(self.data_as_casadi.keys) != {'x'} or not set(fused.name_in) <= {'u', 't', 'dt', 'x'}:
+            return None
+        f = fused.function
+        nx = ca.DM(self.data_as_casadi.x).numel()
+        syms = {
+            'x': ca.MX.sym('x', nx),
+            'u': ca.MX.sym('u', f.sparsity_in('u') if 'u' in fused.name_in else ca.Sparsity.dense(1)),
+            't': ca.MX.sym('t'),
+            'dt': ca.MX.sym('dt'),
+        }
+        dx = f.call([syms[name] for name in fused.name_in])[self._dx_index]
+        fn = ca.Function(f"{type(self).__name__}_transition", list(syms.values()),
+                         [syms['x'] + dx * syms['dt'], dx], list(syms.keys()), ['x_next', 'y'])
+        try:
+            return fn.expand()
+        except RuntimeError:
+            return fn
+
+    @classmethod
+    def batch_step_function(cls, systems, parallelization="thread"):
+        """
+        Return a `BatchedDynSystemStep` stepping all systems in one call, or None
+        if they cannot be batched.
+
+        The systems must be instances of the same class sharing their parameters,
+        with a `transition_function`.
+        """
+        if len(systems) == 0:
+            return None
+        first = systems[0]
+        if any(type(s) is not type(first) or s.params is not first.params for s in systems):
+            return None
+        fn = first.transition_function()
+        if fn is None:
+            return None
+        return BatchedDynSystemStep(systems, MappedStepFunction(fn, len(systems), parallelization))
+
     def update_data(self, new_data):
         for key, value in new_data.items():
             key_without_new = key.replace('new_', '')
@@ -48,6 +145,12 @@ class CasadiDynSystem(DynSystem):
     def on_step(self, u, t, dt, data=None, *args, **kwargs):
         if data is None:
             data = self.data_as_casadi
+        if self.step_function is not None:
+            dx = self.step_function((u, t, dt), data)[self._dx_index]
+            # the state is kept as a NumPy array, avoiding DM arithmetic per step
+            data.x = np.asarray(data.x) + dx * dt
+            self.last_el = dx[:, 0]
+            return self.last_el
         d = {
             'u': u,
             't': t,
@@ -91,20 +194,106 @@ class CasadiDynSystem(DynSystem):
 
 
 
+class BatchedDynSystemStep:
+    """
+    Steps N CasADi systems with a single call of their mapped transition function.
+
+    The inputs of all systems are written into the columns of `U` before calling.
+    The state and `last_el` of every system are updated as by `step`.
+    """
+
+    def __init__(self, systems, mapped):
+        self.systems = list(systems)
+        self.mapped = mapped
+        self.X = np.zeros((mapped.function.size1_in(0), len(self.systems)))
+        self.U = np.zeros((mapped.function.size1_in(1), len(self.systems)))
+        # states set by the last call, as columns of X
+        self._states = [None] * len(self.systems)
+
+    def __call__(self, t, dt):
+        for i, s in enumerate(self.systems):
+            x = s.data_as_casadi.x
+            # states changed outside of the batch, e.g. by configure, are gathered again
+            if x is not self._states[i]:
+                self.X[:, i] = x.full().ravel() if isinstance(x, ca.DM) else np.ravel(x)
+        x_next, y = self.mapped(self.X, self.U, t, dt)
+        self.X = x_next
+        self._states = [x_next[:, i:i + 1] for i in range(len(self.systems))]
+        for s, x, y_i in zip(self.systems, self._states, y.T):
+            s.data_as_casadi.x = x
+            s.last_el = y_i
+        return y
+
+
 class CasadiDiscreteDynSystem(DynSystem):
     pass
 
 
 class CasadiContinuousDynSystem(CasadiDynSystem):
-    """Continuous-time dynamical system with CasADi integration."""
+    """
+    Continuous-time dynamical system with CasADi integration.
+
+    The dynamics are integrated over the step `dt` with time scaled to [0, 1],
+    so a single integrator serves every sample time. Integrators are cached per
+    plugin class, parameters, method and number of sub-steps, and shared by all
+    instances with the same ones.
+    """
+
+    # integration method, 'rk' (RK4), 'collocation' or 'cvodes'
+    integrator_method = 'rk'
+    # number of integration sub-steps (finite elements) per step
+    integrator_steps = 1
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.integrator = self._build_integrator(num_steps=1)
-
+        key = plugin_cache_key(self, type(self).__qualname__, self.integrator_method,
+                               self.integrator_steps, bool(self.codegen))
+        if key not in _integrator_cache:
+            integrator = self._expand_integrator(
+                self._build_integrator(self.integrator_method, self.integrator_steps))
+            if self.codegen:
+                integrator = compile_function(integrator, key)
+            _integrator_cache[key] = integrator
+        self.integrator = _integrator_cache[key]
+
+    def transition_function(self):
+        """Return the function (x, u, t, dt) -> (x_next, y) of one integration step."""
+        if type(self).on_step is not CasadiContinuousDynSystem.on_step:
+            return None
+        x = ca.MX.sym('x', self.integrator.sparsity_in(0))
+        n_p = self.integrator.size1_in(1)
+        u = ca.MX.sym('u', n_p - 1)
+        t = ca.MX.sym('t')
+        dt = ca.MX.sym('dt')
+        x_next = self.integrator(x, ca.vertcat(u, dt))
+        fn = ca.Function(f"{type(self).__name__}_transition", [x, u, t, dt], [x_next, x_next],
+                         ['x', 'u', 't', 'dt'], ['x_next', 'y'])
+        try:
+            return fn.expand()
+        except RuntimeError:
+            return fn
+
+    def _expand_integrator(self, integrator):
+        """Wrap the integrator into a function of its 'x0' and 'p' inputs, expanded to SX operations if possible."""
+        x0 = ca.MX.sym('x0', integrator.sparsity_in('x0'))
+        p = ca.MX.sym('p', integrator.sparsity_in('p'))
+        xf = integrator(x0=x0, p=p)['xf']
+        fn = ca.Function(f"{type(self).__name__}_integrator", [x0, p], [xf], ['x0', 'p'], ['xf'])
+        try:
+            return fn.expand()
+        except RuntimeError:
+            return fn
 
     def _build_integrator(self, integrator_type='rk', num_steps=1):
-        """Build a CasADi integrator (RK4 or Cvodes) with dt as a parameter."""
+        """
+        Build a CasADi integrator of the dynamics over one step.
+
+        The parameter of the integrator is [u; dt]. Time is scaled by dt, so the
+        integration runs from 0 to 1 in `num_steps` sub-steps of the chosen method.
+        """
+        if integrator_type not in ('rk', 'collocation', 'cvodes'):
+            raise ValueError(f"Unknown integration method '{integrator_type}'. " +
+                             f"Supported methods are 'rk', 'collocation' and 'cvodes'.")
         dae_fn = self.step_fns
         if isinstance(dae_fn, list) and len(dae_fn) == 1:
             dae_fn = dae_fn[0]
@@ -119,27 +308,28 @@ class CasadiContinuousDynSystem(CasadiDynSystem):
 
         x_sym = ca.MX.sym('x', dae_fn.size1_in(0))
         u_sym = ca.MX.sym('u', dae_fn.size1_in(1))
+        dt_sym = ca.MX.sym('dt')
 
         dx = dae_fn(x_sym, u_sym)
-        dae = {'x': x_sym, 'p': u_sym, 'ode': dx}
-        if integrator_type == 'rk':
-            integrator = ca.integrator('rk4_integrator', 'rk', dae,
-                                       {"number_of_finite_elements": num_steps, "tf": 0.01})
-        else:
-            integrator = ca.integrator('integrator', integrator_type, dae,
-                                       {"number_of_finite_elements": num_steps, "tf": 0.01})
-        return integrator
+        dae = {'x': x_sym, 'p': ca.vertcat(u_sym, dt_sym), 'ode': dt_sym * dx}
+        if integrator_type == 'cvodes':
+            return ca.integrator('integrator', 'cvodes', dae, 0, 1, {"abstol": 1e-10, "reltol": 1e-10})
+        # fixed step integrators are simplified into plain MX functions,
+        # which are cheaper to evaluate and can be code generated
+        return ca.integrator(f'{integrator_type}_integrator', integrator_type, dae, 0, 1,
+                             {"number_of_finite_elements": num_steps, "simplify": True})
 
     def on_step(self, u, t, dt, data=None, *args, **kwargs):
         """Integrate dynamics from current state over time dt with input u."""
         if data is None:
             data = self.data_as_casadi
 
-        x0 = data.x
-        u = ca.DM(u).reshape((-1, 1))
-
-        integrated = self.integrator(x0=x0, p=u)
-        x_next = ca.DM(integrated['xf'])
+        p = np.concatenate([np.ravel(u), [dt]])
+        x_next = self.integrator(data.x, p)
         data.x = x_next
-        self.last_el = np.array(x_next).ravel()
-        return self.last_el
\ No newline at end of file
+        self.last_el = x_next.full().ravel()
+        return self.last_el
+
+
+# integrators shared by all CasadiContinuousDynSystem instances, see CasadiContinuousDynSystem.__init__
+_integrator_cache = {}
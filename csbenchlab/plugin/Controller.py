@@ -1,5 +1,6 @@
 from abc import abstractmethod
 
+import copy
 import json
 from . import PluginBase
 import numpy as np
@@ -59,4 +60,37 @@ class Controller(PluginBase):
         return result
 
     def reset(self):
-        return self.on_reset()
\ No newline at end of file
+        return self.on_reset()
+
+    def linear_model(self, dt):
+        """
+        Return a `LinearModel` of the step of the configured controller with input [y_ref; y],
+        or None if the step is not linear. Used by the closed-form simulation of
+        linear loops in `ControlEnvironment.run_native`.
+        """
+        return None
+
+    def init_batch(self, batch_size):
+        """
+        Return the state of `batch_size` copies of the configured controller, used by `step_batch`.
+        The default state is a list of independent copies of the controller.
+        """
+        return [copy.deepcopy(self) for _ in range(batch_size)]
+
+    def step_batch(self, states, y_ref, y, dt):
+        """
+        Step a batch of controller copies in lockstep.
+
+        The default implementation steps every copy in a loop. Plugins may override
+        it together with `init_batch` to step the whole batch with array operations.
+
+        Args:
+            states: Batch state from `init_batch` or the previous `step_batch`.
+            y_ref (np.ndarray): References, (B, n_ref).
+            y (np.ndarray): Measured outputs, (B, n_y).
+            dt (float): Time step.
+        Returns:
+            tuple: The new batch state and the control inputs, (B, n_u).
+        """
+        u = np.stack([np.ravel(c.step(y_ref[i], y[i], dt)) for i, c in enumerate(states)])
+        return states, u
\ No newline at end of file
@@ -1,9 +1,25 @@
 from abc import abstractmethod
 from . import PluginBase
+from csbenchlab.noise_stream import NoiseStream
+from functools import partial
+import copy
 import numpy as np
 
 
 class DisturbanceGenerator(PluginBase):
+    """
+    Base class of disturbance generators.
+
+    Random generators draw their noise from the per-instance generator `rng`,
+    seeded by the environment from the scenario 'RandomSeed'. Generators defining
+    `draw_noise(rng, n, dt)`, returning n noise samples, get them pre-generated in
+    blocks: `next_noise` returns the next sample of the stream, and the environment
+    draws the noise of a whole run at once with `pregenerate_noise`. Their batch
+    copies only keep a noise stream each, applied to the outputs with `apply_noise`.
+    """
+
+    # number of noise samples drawn at once when the stream runs out
+    noise_block_size = 4096
 
     def __init__(self, *args, **kwargs):
         super().__init__()
@@ -14,6 +30,8 @@ class DisturbanceGenerator(PluginBase):
         self.is_simulink = parsed.get('is_simulink', False)
         self.data = parsed.get('Data', None)
         self.last_el = None
+        self.rng = np.random.default_rng()
+        self._noise = None
         if hasattr(self, 'create_data_model') and self.data is None:
             self.data = self.create_data_model(self.params)
         self.initialize(**kwargs)
@@ -45,10 +63,101 @@ class DisturbanceGenerator(PluginBase):
         self.last_el = self._ic
         return self.on_configure()
 
+    def seed(self, seed=None):
+        """Reset the random generator of the plugin from an int or a np.random.SeedSequence."""
+        self.rng = np.random.default_rng(seed)
+        # noise drawn from the previous generator is discarded
+        self._noise = None
+
+    def has_noise_stream(self):
+        """Check if the plugin noise is drawn from a `NoiseStream`, see `noise_stream`."""
+        return hasattr(self, 'draw_noise') or type(self).noise_stream is not DisturbanceGenerator.noise_stream
+
+    def noise_stream(self, dt, rng=None):
+        """
+        Return a `NoiseStream` of the plugin noise sampled with time step dt and
+        drawn from rng (the plugin generator by default), or None without `draw_noise`.
+        """
+        if not hasattr(self, 'draw_noise'):
+            return None
+        return NoiseStream(partial(self.draw_noise, dt=dt), self.rng if rng is None else rng,
+                           self.noise_block_size)
+
+    def pregenerate_noise(self, num_steps, dt):
+        """Draw the noise of the next num_steps samples at once."""
+        if self._noise is None:
+            self._noise = self.noise_stream(dt)
+        if self._noise is not None:
+            self._noise.reserve(num_steps)
+
+    def next_noise(self, dt):
+        """Return the next pre-generated noise sample."""
+        if self._noise is None:
+            self._noise = self.noise_stream(dt)
+        return self._noise.next()
+
+    def apply_noise(self, y, noise):
+        """Return the outputs y disturbed by the noise samples, added by default."""
+        y = np.asarray(y)
+        return y + np.reshape(noise, y.shape)
+
     def step(self, u, dt, *args, **kwargs):
         result = self.on_step(u, dt, *args)
         self.last_el = result
         return result
 
     def reset(self):
-        return self.on_reset()
\ No newline at end of file
+        return self.on_reset()
+
+    def linear_model(self, dt):
+        """
+        Return a `LinearModel` of the step of the configured generator with input y,
+        or None if the step is not linear. Used by the closed-form simulation of
+        linear loops in `ControlEnvironment.run_native`.
+        """
+        return None
+
+    def init_batch(self, batch_size, seeds=None):
+        """
+        Return the state of `batch_size` copies of the configured generator, used by `step_batch`.
+        The default state is a list of independent copies of the generator, or a random
+        generator per copy for plugins with a noise stream.
+
+        Args:
+            batch_size (int): Number of copies.
+            seeds (list): Seed of the random generator of every copy, see `seed`.
+                Independent generators are spawned from the generator of this instance if None.
+        """
+        if seeds is None:
+            seeds = self.rng.spawn(batch_size)
+        if self.has_noise_stream():
+            # a copy draws the same noise as a single instance seeded alike
+            return [np.random.default_rng(seed) for seed in seeds]
+        copies = [copy.deepcopy(self) for _ in range(batch_size)]
+        for c, seed in zip(copies, seeds):
+            c.seed(seed)
+        return copies
+
+    def step_batch(self, states, y, dt):
+        """
+        Step a batch of generator copies in lockstep.
+
+        The default implementation steps every copy in a loop, or takes the next
+        sample of the noise stream of every copy for plugins with a noise stream.
+        Plugins may override it together with `init_batch` to step the whole batch
+        with array operations.
+
+        Args:
+            states: Batch state from `init_batch` or the previous `step_batch`.
+            y (np.ndarray): System outputs, (B, n_y).
+            dt (float): Time step.
+        Returns:
+            tuple: The new batch state and the disturbed outputs, (B, n_y).
+        """
+        if self.has_noise_stream():
+            # the noise streams are created on the first step, when the time step is known
+            if len(states) > 0 and not isinstance(states[0], NoiseStream):
+                states = [self.noise_stream(dt, rng) for rng in states]
+            return states, self.apply_noise(y, np.stack([stream.next() for stream in states]))
+        y_n = np.stack([np.ravel(d.step(y[i], dt)) for i, d in enumerate(states)])
+        return states, y_n
\ No newline at end of file
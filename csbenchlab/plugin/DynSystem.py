@@ -1,5 +1,6 @@
 from abc import abstractmethod
 from . import PluginBase
+import copy
 import numpy as np
 
 
@@ -56,4 +57,37 @@ class DynSystem(PluginBase):
         return result
 
     def reset(self):
-        return self.on_reset()
\ No newline at end of file
+        return self.on_reset()
+
+    def linear_model(self, dt):
+        """
+        Return a `LinearModel` of the step of the configured system with input u,
+        or None if the step is not linear. Used by the closed-form simulation of
+        linear loops in `ControlEnvironment.run_native`.
+        """
+        return None
+
+    def init_batch(self, batch_size):
+        """
+        Return the state of `batch_size` copies of the configured system, used by `step_batch`.
+        The default state is a list of independent copies of the system.
+        """
+        return [copy.deepcopy(self) for _ in range(batch_size)]
+
+    def step_batch(self, states, u, t, dt):
+        """
+        Step a batch of system copies in lockstep.
+
+        The default implementation steps every copy in a loop. Plugins may override
+        it together with `init_batch` to step the whole batch with array operations.
+
+        Args:
+            states: Batch state from `init_batch` or the previous `step_batch`.
+            u (np.ndarray): Inputs, (B, n_u).
+            t (float): Time.
+            dt (float): Time step.
+        Returns:
+            tuple: The new batch state and the outputs, (B, n_y).
+        """
+        y = np.stack([np.ravel(s.step(u[i], t, dt)) for i, s in enumerate(states)])
+        return states, y
\ No newline at end of file
@@ -0,0 +1,59 @@
+from abc import abstractmethod
+from .DisturbanceGenerator import DisturbanceGenerator
+from csbenchlab.noise_stream import NoiseStream, FilteredNoise
+from scipy.signal import sosfilt, sos2zpk
+import numpy as np
+
+
+def sos_noise_gain(sos, num_samples=2 ** 15):
+    """Standard deviation of the output of a stable filter driven by unit white noise."""
+    impulse = np.zeros(num_samples)
+    impulse[0] = 1.0
+    return float(np.sqrt(np.sum(sosfilt(sos, impulse) ** 2)))
+
+
+class FilteredNoiseGenerator(DisturbanceGenerator):
+    """
+    Base class of generators adding colored Gaussian noise to the system outputs.
+
+    Every output gets independent white noise shaped by the IIR filter returned by
+    `noise_filter`. The noise is drawn and filtered in blocks by a `NoiseStream`,
+    so a step only takes the next sample. Stable filters are started with a burn-in
+    of `warmup_samples`, so the noise is stationary from the first sample.
+    """
+
+    # the filter transient is run until it decays below this fraction
+    warmup_tolerance = 1e-6
+    # upper bound of the burn-in samples
+    max_warmup_samples = 10 ** 6
+
+    @abstractmethod
+    def noise_filter(self, dt):
+        """
+        Return the filter shaping unit white noise sampled with time step dt.
+
+        Returns:
+            np.ndarray: Second-order sections, (n_sections, 6), see `scipy.signal.sosfilt`.
+        """
+        pass
+
+    def warmup_samples(self, sos):
+        """Number of samples until the transient of a stable filter decays, 0 for unstable filters."""
+        _, poles, _ = sos2zpk(sos)
+        r = np.max(np.abs(poles)) if len(poles) > 0 else 0.0
+        if r == 0.0 or r >= 1.0:
+            return 0
+        return int(min(np.ceil(np.log(self.warmup_tolerance) / np.log(r)), self.max_warmup_samples))
+
+    def noise_stream(self, dt, rng=None):
+        sos = self.noise_filter(dt)
+        draw = FilteredNoise(sos, self.system_dims["Outputs"], getattr(self.params, 'mean', 0.0))
+        stream = NoiseStream(draw, self.rng if rng is None else rng, self.noise_block_size)
+        warmup = self.warmup_samples(sos)
+        if warmup > 0:
+            # the samples of the filter transient are discarded
+            stream.take(warmup)
+        return stream
+
+    def on_step(self, y, dt):
+        return self.apply_noise(y, self.next_noise(dt))
@@ -4,4 +4,5 @@ from .DynSystem import DynSystem
 from .Estimator import Estimator
 from .DisturbanceGenerator import DisturbanceGenerator
 from .CasadiController import CasadiController
-from .CasadiDynSystem import CasadiDynSystem, CasadiContinuousDynSystem, CasadiDiscreteDynSystem
\ No newline at end of file
+from .CasadiDynSystem import CasadiDynSystem, CasadiContinuousDynSystem, CasadiDiscreteDynSystem
+from .FilteredNoiseGenerator import FilteredNoiseGenerator
\ No newline at end of file
@@ -1,5 +1,8 @@
 import os
 
+# absolute module path -> ((modification time, size), module)
+_module_cache = {}
+
 def parse_plugin_type(plugin_class):
     """
     Parses the type of a plugin class to determine if it is a 'Controller', 'System', or else.
@@ -21,12 +24,18 @@ def parse_plugin_type(plugin_class):
         return 'dist'
     return ''
 
-def import_module_from_path(module_path: str):
+def import_module_from_path(module_path: str, use_cache: bool = True):
     """
     Imports a Python module from a given file path.
 
+    Modules are cached for the whole process by their absolute path. A cached module
+    is returned as long as the modification time and size of its file are unchanged,
+    otherwise the file is executed again.
+
     Args:
         module_path (str): The file path to the Python module.
+        use_cache (bool): Return the cached module if it is up to date. The file is
+            executed and the cache updated if False.
 
     Returns:
         module: The imported Python module.
@@ -38,14 +47,35 @@ def import_module_from_path(module_path: str):
     import os
     if not os.path.exists(module_path):
         raise ValueError(f"Module path '{module_path}' does not exist.")
+    path = os.path.abspath(module_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _module_cache.get(path, None)
+    if use_cache and cached is not None and cached[0] == version:
+        return cached[1]
+
     module_name = os.path.splitext(os.path.basename(module_path))[0]
     spec = importlib.util.spec_from_file_location(module_name, module_path)
     if spec is None:
         raise ValueError(f"Could not find module '{module_name}' at path '{module_path}'.")
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
+    _module_cache[path] = (version, module)
     return module
 
+def invalidate_module_cache(module_path: str = None):
+    """
+    Removes a module from the cache of `import_module_from_path`, so it is executed
+    again on the next import.
+
+    Args:
+        module_path (str): The file path to the Python module. The whole cache is cleared if None.
+    """
+    if module_path is None:
+        _module_cache.clear()
+    else:
+        _module_cache.pop(os.path.abspath(module_path), None)
+
 def get_plugin_class(plugin_path: str) -> dict:
     """
     Retrieves information about a plugin by its name.
@@ -0,0 +1,430 @@
+import ast, os, sys
+from importlib.machinery import PathFinder
+
+
+PLUGIN_PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugin')
+
+# plugin type -> base class, checked in the order of `parse_plugin_type`
+_TYPE_BASES = [('sys', 'DynSystem'), ('ctl', 'Controller'),
+               ('est', 'Estimator'), ('dist', 'DisturbanceGenerator')]
+# external base classes which do not define plugin attributes
+_OPAQUE_BASES = {('abc', 'ABC')}
+# calls which can change module or class attributes in ways not visible in the source
+_DYNAMIC_CALLS = {'setattr', 'delattr', 'exec', 'eval', 'globals', 'locals', 'vars'}
+
+# absolute module path -> ((modification time, size), _Module)
+_module_cache = {}
+
+
+class AmbiguousPluginError(Exception):
+    """Raised when plugin information cannot be derived from the source alone."""
+    pass
+
+
+_UNKNOWN = ('unknown',)
+
+
+def _stored_names(node):
+    """Names a statement can bind or delete, without descending into function bodies."""
+    names = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, ast.Name) and isinstance(n.ctx, (ast.Store, ast.Del)):
+            names.add(n.id)
+        elif isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(n.name)
+            # decorators, bases and defaults are evaluated in the enclosing scope
+            stack.extend(n.decorator_list)
+            stack.extend(getattr(n, 'bases', []))
+            continue
+        elif isinstance(n, (ast.Import, ast.ImportFrom)):
+            names.update((a.asname or a.name).split('.')[0] for a in n.names)
+        elif isinstance(n, ast.Lambda):
+            continue
+        stack.extend(ast.iter_child_nodes(n))
+    return names
+
+
+def _is_dynamic(node):
+    """Check if a statement calls a function from `_DYNAMIC_CALLS` outside of function bodies."""
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id in _DYNAMIC_CALLS:
+            return True
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        stack.extend(ast.iter_child_nodes(n))
+    return False
+
+
+def _bindings(body):
+    """
+    Name bindings of a module or class body, assuming it runs top to bottom.
+
+    Returns:
+        dict: Name -> list of (statement index, binding), where a binding is
+            ('class', node), ('value', expr), ('import', module), ('from', module, level, name)
+            or _UNKNOWN for bindings which depend on control flow.
+        set: Names whose attributes are assigned or deleted.
+        bool: True if the body contains dynamic calls or star imports.
+    """
+    bindings = {}
+    mutated = set()
+    dynamic = False
+
+    def bind(name, i, binding):
+        bindings.setdefault(name, []).append((i, binding))
+
+    for i, stmt in enumerate(body):
+        dynamic = dynamic or _is_dynamic(stmt)
+        if isinstance(stmt, ast.ClassDef):
+            bind(stmt.name, i, ('class', stmt))
+            continue
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            bind(stmt.name, i, _UNKNOWN)
+            continue
+        if isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                if alias.asname is not None:
+                    bind(alias.asname, i, ('import', alias.name))
+                else:
+                    top = alias.name.split('.')[0]
+                    bind(top, i, ('import', top))
+            continue
+        if isinstance(stmt, ast.ImportFrom):
+            for alias in stmt.names:
+                if alias.name == '*':
+                    dynamic = True
+                else:
+                    bind(alias.asname or alias.name, i, ('from', stmt.module, stmt.level, alias.name))
+            continue
+
+        for n in ast.walk(stmt):
+            if isinstance(n, (ast.Attribute, ast.Subscript)) and isinstance(n.ctx, (ast.Store, ast.Del)):
+                root = n.value
+                while isinstance(root, (ast.Attribute, ast.Subscript)):
+                    root = root.value
+                if isinstance(root, ast.Name):
+                    mutated.add(root.id)
+        if isinstance(stmt, ast.Assign) and all(isinstance(t, ast.Name) for t in stmt.targets):
+            for t in stmt.targets:
+                bind(t.id, i, ('value', stmt.value))
+            stored = _stored_names(stmt.value)
+        elif isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name):
+            if stmt.value is not None:
+                bind(stmt.target.id, i, ('value', stmt.value))
+            stored = _stored_names(stmt.value) if stmt.value is not None else set()
+        else:
+            stored = _stored_names(stmt)
+        # e.g. bindings in if blocks, loops or assignment expressions
+        for name in stored:
+            bind(name, i, _UNKNOWN)
+    return bindings, mutated, dynamic
+
+
+class _Module:
+    """Parsed module and the bindings of its top-level names."""
+
+    def __init__(self, path, name, package_dir, tree):
+        self.path = path
+        self.name = name
+        # directory relative imports are resolved against, None for top-level modules
+        self.package_dir = package_dir
+        self.is_package = os.path.basename(path) == '__init__.py'
+        self.bindings, self.mutated, self.dynamic = _bindings(tree.body)
+        self._classes = {}
+
+    def get_class(self, node):
+        if node not in self._classes:
+            self._classes[node] = _Class(self, node)
+        return self._classes[node]
+
+
+class _Class:
+    """Class definition found in a module."""
+
+    def __init__(self, module, node):
+        self.module = module
+        self.node = node
+        self.key = (module.path, node.name, node.lineno)
+        self.bindings, mutated, self.dynamic = _bindings(node.body)
+
+
+def _load_module(path, name, package_dir, source=None):
+    path = os.path.normcase(os.path.abspath(path))
+    if source is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise AmbiguousPluginError(f"Module '{path}' cannot be read.")
+        version = (st.st_mtime_ns, st.st_size)
+        cached = _module_cache.get(path, None)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(path, 'rb') as f:
+            source = f.read()
+    else:
+        version = None
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError):
+        raise AmbiguousPluginError(f"Module '{path}' cannot be parsed.")
+    module = _Module(path, name, package_dir, tree)
+    if version is not None:
+        _module_cache[path] = (version, module)
+    return module
+
+
+def _source_file(location, part):
+    """Source file of the module or package 'part' in a directory, or None."""
+    init = os.path.join(location, part, '__init__.py')
+    if os.path.isfile(init):
+        return init
+    file = os.path.join(location, part + '.py')
+    return file if os.path.isfile(file) else None
+
+
+def _find_module(name, search_path):
+    """Find and parse the source of an absolutely imported module."""
+    parts = name.split('.')
+    top = sys.modules.get(parts[0], None)
+    spec = getattr(top, '__spec__', None) if top is not None else None
+    if spec is None:
+        spec = PathFinder.find_spec(parts[0], search_path)
+    if spec is None or spec.origin is None or not spec.origin.endswith('.py'):
+        raise AmbiguousPluginError(f"Source of module '{name}' not found.")
+    path = spec.origin
+    for i, part in enumerate(parts[1:], start=1):
+        if os.path.basename(path) != '__init__.py':
+            raise AmbiguousPluginError(f"Module '{'.'.join(parts[:i])}' is not a package.")
+        path = _source_file(os.path.dirname(path), part)
+        if path is None:
+            raise AmbiguousPluginError(f"Source of module '{name}' not found.")
+    is_package = len(parts) > 1 or os.path.basename(path) == '__init__.py'
+    return _load_module(path, name, os.path.dirname(path) if is_package else None)
+
+
+def _find_relative_module(module, name, level):
+    if module.package_dir is None:
+        raise AmbiguousPluginError(f"Relative import in top-level module '{module.path}'.")
+    directory = module.package_dir
+    for _ in range(level - 1):
+        directory = os.path.dirname(directory)
+    package = module.name.split('.')
+    package = package if module.is_package else package[:-1]
+    package = package[:len(package) - (level - 1)] if level > 1 else package
+    path = os.path.join(directory, '__init__.py')
+    for part in (name.split('.') if name else []):
+        path = _source_file(os.path.dirname(path), part)
+        if path is None:
+            raise AmbiguousPluginError(f"Source of module '{name}' not found.")
+        package = package + [part]
+    if not os.path.isfile(path):
+        raise AmbiguousPluginError(f"Source of package '{directory}' not found.")
+    return _load_module(path, '.'.join(package), os.path.dirname(path))
+
+
+class _Resolver:
+    """Resolves names and expressions in parsed modules to classes and modules."""
+
+    def __init__(self, search_path):
+        self.search_path = search_path
+        # paths of the modules the resolved names depend on
+        self.sources = set()
+
+    def use(self, module):
+        self.sources.add(module.path)
+        return module
+
+    def binding(self, bindings, name, before=None):
+        """Last binding of a name before a statement index, None if it is not bound."""
+        entries = [b for i, b in bindings.get(name, []) if before is None or i < before]
+        if not entries:
+            return None
+        if _UNKNOWN in entries:
+            raise AmbiguousPluginError(f"Binding of '{name}' depends on control flow.")
+        return entries[-1]
+
+    def name(self, module, name, before=None, depth=0):
+        if depth > 50:
+            raise AmbiguousPluginError(f"Cannot resolve '{name}'.")
+        binding = self.binding(module.bindings, name, before)
+        if binding is None:
+            if module.dynamic:
+                raise AmbiguousPluginError(f"Module '{module.path}' has dynamic bindings.")
+            if name == 'object':
+                return ('object',)
+            raise AmbiguousPluginError(f"Name '{name}' not found in module '{module.path}'.")
+        kind = binding[0]
+        if kind == 'class':
+            return ('class', module, binding[1])
+        if kind == 'value':
+            index = next(i for i, b in module.bindings[name] if b is binding)
+            return self.expression(module, binding[1], index, depth + 1)
+        if kind == 'import':
+            return ('module', self.use(_find_module(binding[1], self.search_path)))
+        if kind == 'from':
+            _, source, level, attr = binding
+            if level == 0 and (source, attr) in _OPAQUE_BASES:
+                return ('opaque', source, attr)
+            if level > 0:
+                target = self.use(_find_relative_module(module, source, level))
+            else:
+                target = self.use(_find_module(source, self.search_path))
+            return self.attribute(target, attr, depth + 1)
+        raise AmbiguousPluginError(f"Cannot resolve '{name}'.")
+
+    def attribute(self, module, attr, depth=0):
+        if (module.name, attr) in _OPAQUE_BASES:
+            return ('opaque', module.name, attr)
+        if attr in module.bindings or module.dynamic or not module.is_package:
+            return self.name(module, attr, None, depth)
+        path = _source_file(os.path.dirname(module.path), attr)
+        if path is None:
+            raise AmbiguousPluginError(f"Name '{attr}' not found in module '{module.path}'.")
+        return ('module', self.use(_load_module(path, f"{module.name}.{attr}", os.path.dirname(path))))
+
+    def expression(self, module, expr, before=None, depth=0):
+        if isinstance(expr, ast.Name):
+            return self.name(module, expr.id, before, depth)
+        if isinstance(expr, ast.Attribute):
+            value = self.expression(module, expr.value, before, depth)
+            if value[0] == 'module':
+                return self.attribute(value[1], expr.attr, depth)
+        raise AmbiguousPluginError(f"Cannot resolve expression in module '{module.path}'.")
+
+    def mro(self, resolved, depth=0):
+        """C3 linearization of a resolved class, without 'object'."""
+        if resolved[0] == 'opaque':
+            return [resolved]
+        if resolved[0] != 'class' or depth > 50:
+            raise AmbiguousPluginError("Base is not a class.")
+        _, module, node = resolved
+        if node.decorator_list or node.keywords:
+            raise AmbiguousPluginError(f"Class '{node.name}' has decorators or keywords.")
+        if node.name in module.mutated or module.dynamic:
+            raise AmbiguousPluginError(f"Class '{node.name}' may be modified after its definition.")
+        cls = module.get_class(node)
+        if cls.dynamic:
+            raise AmbiguousPluginError(f"Class '{node.name}' has dynamic bindings.")
+        index = next(i for i, b in module.bindings[node.name] if b[0] == 'class' and b[1] is node)
+        bases = [self.expression(module, b, index, depth) for b in node.bases]
+        bases = [b for b in bases if b[0] != 'object']
+        linearizations = [self.mro(b, depth + 1) for b in bases]
+        return [cls] + _merge(linearizations + [[l[0] for l in linearizations]])
+
+
+def _key(entry):
+    return entry.key if isinstance(entry, _Class) else entry
+
+
+def _merge(sequences):
+    """Merge step of the C3 linearization."""
+    sequences = [list(s) for s in sequences if s]
+    result = []
+    while sequences:
+        for s in sequences:
+            head = _key(s[0])
+            if not any(head in [_key(e) for e in t[1:]] for t in sequences):
+                break
+        else:
+            raise AmbiguousPluginError("Inconsistent method resolution order.")
+        result.append(s[0])
+        sequences = [[e for e in t if _key(e) != head] for t in sequences]
+        sequences = [t for t in sequences if t]
+    return result
+
+
+def _attribute_value(mro, attr):
+    """Class body expression of an attribute looked up along the MRO, None if it is not defined."""
+    for entry in mro:
+        if not isinstance(entry, _Class):
+            continue
+        entries = entry.bindings.get(attr, [])
+        if not entries:
+            continue
+        binding = entries[-1][1]
+        if _UNKNOWN in [b for _, b in entries] or binding[0] != 'value':
+            raise AmbiguousPluginError(f"Attribute '{attr}' of '{entry.node.name}' is not a plain value.")
+        return binding[1]
+    return None
+
+
+def _literal(expr, attr):
+    try:
+        return ast.literal_eval(expr)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        raise AmbiguousPluginError(f"Attribute '{attr}' is not a literal.")
+
+
+def _has_parameters(expr):
+    if expr is None:
+        return False
+    if isinstance(expr, (ast.List, ast.Tuple)) and not any(isinstance(e, ast.Starred) for e in expr.elts):
+        # the descriptors themselves are not evaluated
+        return len(expr.elts) > 0
+    value = _literal(expr, 'param_description')
+    return value is not None and len(value) > 0
+
+
+def read_plugin_info(plugin_path: str, source: bytes = None, search_path: list = None,
+                     sources: set = None) -> dict:
+    """
+    Derives the information of a plugin from its source, without importing it.
+
+    The plugin class is the class named as the file. Its base classes are followed
+    through the imports to their source files and its MRO is computed as Python
+    would. 'description', 'param_description' and 'casadi_plugin__' are read from
+    the class bodies along the MRO and must be literals, except for the
+    'param_description' list whose length is enough.
+
+    Args:
+        plugin_path (str): The path to the plugin file.
+        source (bytes): Content of the plugin file, read from plugin_path if None.
+        search_path (list): Directories absolute imports are searched in, sys.path if None.
+        sources (set): If given, the absolute paths of the plugin file and of the module
+            files its base classes were resolved through are added to it.
+
+    Returns:
+        dict: The plugin information as returned by `registry.get_plugin_info_from_file`.
+
+    Raises:
+        AmbiguousPluginError: If the information cannot be derived without running the
+            plugin code, e.g. for attributes computed at import time, dynamic class
+            creation or base classes without Python sources.
+    """
+    if search_path is None:
+        search_path = sys.path
+    plugin_name = os.path.splitext(os.path.basename(plugin_path))[0]
+    module = _load_module(plugin_path, plugin_name, None, source)
+    resolver = _Resolver(search_path)
+    resolver.use(module)
+    resolved = resolver.name(module, plugin_name)
+    mro = resolver.mro(resolved)
+
+    keys = {_key(e)[:2] for e in mro if isinstance(e, _Class)}
+    def is_subclass(base):
+        path = os.path.normcase(os.path.abspath(os.path.join(PLUGIN_PACKAGE_DIR, base + '.py')))
+        return (path, base) in keys
+    if not is_subclass('PluginBase'):
+        raise AmbiguousPluginError(f"Plugin '{plugin_name}' is not derived from 'PluginBase' in its source.")
+    if any(isinstance(e, _Class) and '__init_subclass__' in e.bindings for e in mro[1:]):
+        raise AmbiguousPluginError(f"Plugin '{plugin_name}' has a base with '__init_subclass__'.")
+
+    description = _attribute_value(mro, 'description')
+    casadi_flag = _attribute_value(mro, 'casadi_plugin__')
+    info = {
+        'Name': resolved[2].name,
+        'T': next((t for t, base in _TYPE_BASES if is_subclass(base)), ''),
+        'HasParameters': _has_parameters(_attribute_value(mro, 'param_description')),
+        'Description': 'No description provided.' if description is None
+            else _literal(description, 'description'),
+        'IsCasadi': casadi_flag is not None and _literal(casadi_flag, 'casadi_plugin__') is True,
+        "ComponentPath": plugin_path,
+        "Type": "py"
+    }
+    if sources is not None:
+        sources.update(resolver.sources)
+    return info
@@ -1,6 +1,12 @@
-import os, sys
+import os, sys, hashlib, inspect
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from csbenchlab.plugin_helpers import parse_plugin_type, get_plugin_class
+from csbenchlab.plugin_metadata import read_plugin_info, AmbiguousPluginError
+
+# plugin files read statically by one worker process at least, fewer files are read in
+# the current process as starting a worker takes about as long as reading them
+FILES_PER_WORKER = 64
 
 
 def is_casadi_component(plugin_class: type) -> bool:
@@ -17,10 +23,43 @@ def is_casadi_component(plugin_class: type) -> bool:
         and getattr(plugin_class, 'casadi_plugin__') is True
 
 
+def _add_plugin_search_path(plugin_path):
+    path = str(Path(plugin_path).parent.parent)
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+def _read_plugin_info(args):
+    plugin_path, source, search_path = args
+    sources = set()
+    try:
+        return read_plugin_info(plugin_path, source, search_path, sources), sources
+    except (AmbiguousPluginError, RecursionError):
+        return None
+
+
+def _file_hash(path, file_hashes):
+    """Content hash of a file, None if it cannot be read. Hashes are memoized in file_hashes."""
+    if path not in file_hashes:
+        try:
+            with open(path, 'rb') as f:
+                file_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            file_hashes[path] = None
+    return file_hashes[path]
+
+
+def _source_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
 def get_plugin_info_from_file(plugin_path: str) -> dict:
     """
     Retrieves information about a plugin by its name.
 
+    The information is derived from the plugin source with `read_plugin_info`, and
+    the plugin is only imported if that is ambiguous.
+
     Args:
         plugin_path (str): The name of the plugin to retrieve information for.
 
@@ -31,8 +70,96 @@ def get_plugin_info_from_file(plugin_path: str) -> dict:
     Raises:
         ValueError: If the plugin does not exist or if the plugin name is invalid.
     """
-    sys.path.append(str(Path(plugin_path).parent.parent))
+    _add_plugin_search_path(plugin_path)
+    if os.path.isfile(plugin_path):
+        result = _read_plugin_info((plugin_path, None, sys.path))
+        if result is not None:
+            return result[0]
+    return import_plugin_info_from_file(plugin_path)
+
+
+def get_plugin_infos_from_files(plugin_paths: list, known: dict = None, jobs: int = None):
+    """
+    Retrieves information about several plugins, see `get_plugin_info_from_file`.
+
+    The information of a plugin is derived from the plugin file and the files of its
+    base classes. Plugins whose files all have the content hashes the known information
+    was derived with, e.g. for the last manifest, are not read again. The other files
+    are read statically, in parallel worker processes for large libraries, and the
+    ambiguous ones are imported in the current process.
+
+    Args:
+        plugin_paths (list): Paths to the plugin files.
+        known (dict): Plugin path -> (source hashes, plugin information) derived before.
+        jobs (int): Maximum number of worker processes, the number of CPUs if None.
+
+    Returns:
+        list: The information of every plugin, in the order of plugin_paths.
+        dict: Plugin path -> source hashes, a dict of source file path -> content hash
+            of the files the information was derived from.
+    """
+    known = known or {}
+    infos = [None] * len(plugin_paths)
+    hashes = {}
+    file_hashes = {}
+    pending = []
+    for i, plugin_path in enumerate(plugin_paths):
+        _add_plugin_search_path(plugin_path)
+        if not os.path.isfile(plugin_path):
+            raise ValueError(f"Plugin path '{plugin_path}' does not exist.")
+        with open(plugin_path, 'rb') as f:
+            source = f.read()
+        file_hashes[_source_path(plugin_path)] = hashlib.sha256(source).hexdigest()
+        source_hashes = known[plugin_path][0] if plugin_path in known else None
+        if isinstance(source_hashes, dict) and _source_path(plugin_path) in source_hashes and \
+                all(_file_hash(path, file_hashes) == h for path, h in source_hashes.items()):
+            infos[i] = dict(known[plugin_path][1])
+            hashes[plugin_path] = dict(source_hashes)
+        else:
+            pending.append((i, (plugin_path, source, list(sys.path))))
+
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, -(-len(pending) // FILES_PER_WORKER))
+    args = [a for _, a in pending]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_read_plugin_info, args,
+                                        chunksize=-(-len(args) // jobs)))
+    else:
+        results = [_read_plugin_info(a) for a in args]
+
+    for (i, (plugin_path, _, _)), result in zip(pending, results):
+        if result is not None:
+            infos[i], sources = result
+        else:
+            sources = set()
+            infos[i] = import_plugin_info_from_file(plugin_path, sources)
+        sources.add(_source_path(plugin_path))
+        hashes[plugin_path] = {path: _file_hash(path, file_hashes) for path in sorted(sources)}
+    return infos, hashes
+
+
+def import_plugin_info_from_file(plugin_path: str, sources: set = None) -> dict:
+    """
+    Retrieves information about a plugin by importing it, see `get_plugin_info_from_file`.
+
+    Args:
+        plugin_path (str): The path to the plugin file.
+        sources (set): If given, the absolute paths of the source files of the plugin
+            class and its bases are added to it.
+    """
+    _add_plugin_search_path(plugin_path)
     plugin_class = get_plugin_class(plugin_path)
+    if sources is not None:
+        for cls in plugin_class.__mro__:
+            try:
+                source_file = inspect.getsourcefile(cls)
+            except TypeError:
+                # builtin classes
+                continue
+            if source_file is not None:
+                sources.add(_source_path(source_file))
 
 
     plugin_name = plugin_class.__name__
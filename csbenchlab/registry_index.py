@@ -0,0 +1,299 @@
+import os, json, json5, sqlite3, threading
+
+
+# the index is kept in a subdirectory, so index writes do not change the registry directory
+INDEX_DIR_NAME = '.index'
+INDEX_FILE_NAME = 'registry.sqlite'
+# registry entries which are not libraries
+IGNORED_ENTRIES = ['.', '..', 'slprj', INDEX_DIR_NAME]
+# indexes with another schema version are rebuilt
+SCHEMA_VERSION = '2'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS libraries (
+    entry TEXT PRIMARY KEY,
+    path TEXT,
+    kind TEXT,
+    entry_stamp TEXT,
+    package_stamp TEXT,
+    plugins_stamp TEXT,
+    library TEXT,
+    version TEXT,
+    valid INTEGER,
+    manifest_stamp TEXT,
+    manifest_library TEXT,
+    manifest_version TEXT
+);
+CREATE TABLE IF NOT EXISTS plugins (
+    entry TEXT,
+    position INTEGER,
+    type TEXT,
+    name TEXT,
+    info TEXT,
+    PRIMARY KEY (entry, position)
+);
+CREATE INDEX IF NOT EXISTS libraries_by_path ON libraries (path);
+CREATE INDEX IF NOT EXISTS plugins_by_name ON plugins (entry, name);
+"""
+
+# (process id, registry path) -> RegistryIndex, SQLite connections must not be used across fork()
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _stamp(path):
+    """Modification time and size of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+class RegistryIndex:
+    """
+    SQLite index of the component libraries in a registry directory and of the
+    plugins in their manifests.
+
+    A library is a directory in the registry ('install') or a JSON file in the
+    registry pointing to the library directory ('link'). Lookups only compare the
+    modification times and sizes of the registry directory, the library entry,
+    its 'package.json', 'plugins.json' and 'autogen/manifest.json' with the indexed ones,
+    and re-read the files that changed.
+    """
+
+    def __init__(self, registry_path):
+        """
+        Args:
+            registry_path (str): Registry directory. The index is stored in it.
+        """
+        self.registry_path = registry_path
+        self._lock = threading.RLock()
+        try:
+            index_dir = os.path.join(registry_path, INDEX_DIR_NAME)
+            os.makedirs(index_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(index_dir, INDEX_FILE_NAME),
+                                       timeout=30, check_same_thread=False)
+            self._create_schema()
+        except (OSError, sqlite3.Error):
+            # read-only registry, the index is kept for this process only
+            self._db = sqlite3.connect(':memory:', check_same_thread=False)
+            self._create_schema()
+
+    def _create_schema(self):
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is not None and row[0] == SCHEMA_VERSION:
+            return
+        self._db.executescript("DROP TABLE libraries; DROP TABLE plugins; DELETE FROM meta;")
+        self._db.executescript(_SCHEMA)
+        self._db.execute("INSERT INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,))
+        self._db.commit()
+
+    def _sync_entries(self):
+        """Re-scan the registry directory if entries were added or removed."""
+        stamp = _stamp(self.registry_path)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'registry_stamp'").fetchone()
+        if row is not None and row[0] == stamp:
+            return
+        entries = set()
+        for n in os.listdir(self.registry_path):
+            if n in IGNORED_ENTRIES:
+                continue
+            full_path = os.path.join(self.registry_path, n)
+            if os.path.isdir(full_path):
+                entries.add(n)
+            elif n.endswith('.json'):
+                entries.add(n[:-len('.json')])
+        indexed = {r[0] for r in self._db.execute("SELECT entry FROM libraries")}
+        for entry in indexed - entries:
+            self._db.execute("DELETE FROM libraries WHERE entry = ?", (entry,))
+            self._db.execute("DELETE FROM plugins WHERE entry = ?", (entry,))
+        for entry in entries - indexed:
+            self._db.execute("INSERT INTO libraries (entry) VALUES (?)", (entry,))
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('registry_stamp', ?)", (stamp,))
+
+    def _sync_library(self, entry):
+        """Re-read the files of a library that changed since they were indexed."""
+        row = self._db.execute("SELECT path, kind, entry_stamp, package_stamp, plugins_stamp, manifest_stamp " +
+                               "FROM libraries WHERE entry = ?", (entry,)).fetchone()
+        if row is None:
+            return
+        path, kind, entry_stamp, package_stamp, plugins_stamp, manifest_stamp = row
+        full_path = os.path.join(self.registry_path, entry)
+        if os.path.isdir(full_path):
+            new_kind, new_path, stamp = 'install', os.path.abspath(full_path), None
+        else:
+            new_kind, new_path, stamp = 'link', path, _stamp(full_path + '.json')
+            if stamp != entry_stamp or kind != 'link':
+                with open(full_path + '.json', 'r') as f:
+                    new_path = os.path.abspath(json5.load(f)['Path'])
+        if (new_kind, new_path, stamp) != (kind, path, entry_stamp):
+            if new_path != path:
+                # files of another directory
+                package_stamp, plugins_stamp, manifest_stamp = None, None, None
+            kind, path = new_kind, new_path
+            self._db.execute("UPDATE libraries SET path = ?, kind = ?, entry_stamp = ?, package_stamp = ?, " +
+                             "plugins_stamp = ?, manifest_stamp = ? WHERE entry = ?",
+                             (path, kind, stamp, package_stamp, plugins_stamp, manifest_stamp, entry))
+
+        stamp = _stamp(os.path.join(path, 'package.json'))
+        stamp_plugins = _stamp(os.path.join(path, 'plugins.json'))
+        if stamp != package_stamp or stamp_plugins != plugins_stamp:
+            library, version = None, None
+            if stamp is not None:
+                with open(os.path.join(path, 'package.json'), 'r') as f:
+                    info = json5.load(f)
+                library, version = info.get('Library', None), info.get('Version', None)
+            valid = stamp is not None and stamp_plugins is not None
+            self._db.execute("UPDATE libraries SET package_stamp = ?, plugins_stamp = ?, library = ?, " +
+                             "version = ?, valid = ? WHERE entry = ?",
+                             (stamp, stamp_plugins, library, version, int(valid), entry))
+
+        manifest_file = os.path.join(path, 'autogen', 'manifest.json')
+        stamp = _stamp(manifest_file)
+        if stamp == manifest_stamp:
+            return
+        self._db.execute("DELETE FROM plugins WHERE entry = ?", (entry,))
+        library, version = None, None
+        if stamp is not None:
+            with open(manifest_file, 'r') as f:
+                manifest = json5.load(f)
+            library, version = manifest.get('Library', None), manifest.get('Version', None)
+            rows = []
+            for comp_type, comps in manifest.get('Registry', {}).items():
+                if not isinstance(comps, list):
+                    comps = [comps]
+                for comp in comps:
+                    rows.append((entry, len(rows), comp_type, comp.get('Name', None), json.dumps(comp)))
+            self._db.executemany("INSERT INTO plugins (entry, position, type, name, info) " +
+                                 "VALUES (?, ?, ?, ?, ?)", rows)
+        self._db.execute("UPDATE libraries SET manifest_stamp = ?, manifest_library = ?, manifest_version = ? " +
+                         "WHERE entry = ?", (stamp, library, version, entry))
+
+    def _sync(self, entry=None):
+        self._sync_entries()
+        entries = [r[0] for r in self._db.execute("SELECT entry FROM libraries ORDER BY entry")] \
+            if entry is None else [entry]
+        for e in entries:
+            self._sync_library(e)
+        self._db.commit()
+
+    def _find_entry(self, lib_name_or_path):
+        """Registry entry of a library given by its registry name or its path."""
+        row = self._db.execute("SELECT entry FROM libraries WHERE entry = ?", (lib_name_or_path,)).fetchone()
+        if row is None:
+            path = os.path.abspath(lib_name_or_path)
+            row = self._db.execute("SELECT entry FROM libraries WHERE path = ?", (path,)).fetchone()
+            if row is None and self._db.execute("SELECT 1 FROM libraries WHERE path IS NULL").fetchone():
+                # the paths of new entries are only known after reading them
+                self._sync()
+                row = self._db.execute("SELECT entry FROM libraries WHERE path = ?", (path,)).fetchone()
+        return row[0] if row is not None else None
+
+    def library(self, lib_name_or_path):
+        """
+        Return the index entry of a library.
+
+        Args:
+            lib_name_or_path (str): Registry name of the library or its path.
+        Returns:
+            dict: 'Entry', 'Name' (from 'package.json'), 'Type', 'Path', 'Version', 'Valid'
+                and 'HasManifest' of the library, or None if it is not in the registry.
+        """
+        with self._lock:
+            self._sync_entries()
+            entry = self._find_entry(lib_name_or_path)
+            if entry is None:
+                self._db.commit()
+                return None
+            self._sync(entry)
+            return self._library_row(entry)
+
+    def _library_row(self, entry):
+        path, kind, library, version, valid, manifest_stamp = self._db.execute(
+            "SELECT path, kind, library, version, valid, manifest_stamp FROM libraries WHERE entry = ?",
+            (entry,)).fetchone()
+        return {"Entry": entry, "Name": library, "Type": kind, "Path": path, "Version": version,
+                "Valid": bool(valid), "HasManifest": manifest_stamp is not None}
+
+    def libraries(self):
+        """Return the index entries of all libraries, see `library`."""
+        with self._lock:
+            self._sync()
+            return [self._library_row(r[0]) for r in
+                    self._db.execute("SELECT entry FROM libraries ORDER BY entry").fetchall()]
+
+    def plugin(self, lib_name_or_path, name):
+        """
+        Return the manifest entry of a plugin, or None if the library or the plugin is not indexed.
+
+        Args:
+            lib_name_or_path (str): Registry name of the library or its path.
+            name (str): Plugin name.
+        """
+        with self._lock:
+            self._sync_entries()
+            entry = self._find_entry(lib_name_or_path)
+            if entry is None:
+                self._db.commit()
+                return None
+            self._sync(entry)
+            row = self._db.execute("SELECT info FROM plugins WHERE entry = ? AND name = ? " +
+                                   "ORDER BY position LIMIT 1", (entry, name)).fetchone()
+            return json.loads(row[0]) if row is not None else None
+
+    def plugins(self):
+        """
+        Return the plugins of all libraries with a manifest.
+
+        Returns:
+            dict: Library name (from the manifest) -> plugin type -> list of manifest
+                entries, with the library name and version added as 'Lib' and 'LibVersion'.
+        """
+        with self._lock:
+            self._sync()
+            result = {}
+            libraries = self._db.execute("SELECT entry, manifest_library, manifest_version FROM libraries " +
+                                         "WHERE manifest_stamp IS NOT NULL ORDER BY entry").fetchall()
+            for entry, library, version in libraries:
+                registry = result.setdefault(library, {})
+                for comp_type, info in self._db.execute("SELECT type, info FROM plugins WHERE entry = ? " +
+                                                        "ORDER BY position", (entry,)):
+                    comp = json.loads(info)
+                    comp["Lib"] = library
+                    comp["LibVersion"] = version
+                    registry.setdefault(comp_type, []).append(comp)
+            return result
+
+    def invalidate(self, lib_name_or_path=None):
+        """
+        Mark a library, or all libraries if None, to be re-read on the next lookup.
+        """
+        with self._lock:
+            if lib_name_or_path is None:
+                self._db.execute("DELETE FROM meta WHERE key = 'registry_stamp'")
+                self._db.execute("UPDATE libraries SET entry_stamp = NULL, package_stamp = NULL, " +
+                                 "plugins_stamp = NULL, manifest_stamp = NULL")
+            else:
+                entry = self._find_entry(lib_name_or_path)
+                if entry is not None:
+                    self._db.execute("UPDATE libraries SET entry_stamp = NULL, package_stamp = NULL, " +
+                                     "plugins_stamp = NULL, manifest_stamp = NULL WHERE entry = ?", (entry,))
+            self._db.commit()
+
+
+def get_registry_index(registry_path=None):
+    """
+    Return the `RegistryIndex` of a registry directory, by default the application registry.
+    Every process gets its own index, so forked workers do not use the connection of their parent.
+    """
+    if registry_path is None:
+        from csbenchlab.csb_app_setup import get_app_registry_path
+        registry_path = get_app_registry_path()
+    key = (os.getpid(), os.path.abspath(registry_path))
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = RegistryIndex(registry_path)
+        return _indexes[key]
@@ -1,14 +1,20 @@
 from typing import List
+from types import SimpleNamespace
+from pathlib import Path
 from csbenchlab.plugin import DynSystem, Controller
 from csbenchlab.scenario_templates.csb_blocks import *
 from csbenchlab.plugin_helpers import import_module_from_path, get_plugin_class_from_info
 from csbenchlab.eval_parameters import eval_plugin_params
+from csbenchlab.data_desc import get_component_param_file_path
 import bdsim as bd
 from bdsim.blocks.sources import Constant, Time
 from bdsim.blocks.sinks import Null
 from bdsim.blocks.displays import Scope
 from m_scripts.eval_scenario_descriptions import eval_scenario_descriptions
 from csbenchlab.sim_output import SimOutput
+from csbenchlab.signal_recorder import SignalRecorder
+from csbenchlab.linear_model import ClosedLoopModel
+from csbenchlab.step_profiler import StepProfiler, timed
 
 
 
@@ -21,8 +27,15 @@ class ControlEnvironment:
             "controllers": List[ControllerBlock]
         }
 
-    def __init__(self, env_path: str, env_metadata:dict, backend=None):
+    engines = ["bdsim", "native"]
+
+    def __init__(self, env_path: str, env_metadata:dict, backend=None, engine="bdsim", profile=False):
+        if engine not in self.engines:
+            raise ValueError(f"Unknown simulation engine '{engine}'. Available engines: {self.engines}")
         self.env_path = env_path
+        self.engine = engine
+        self.profile = profile
+        self.profiler = None
         self.env_name = env_metadata.get("Name", "GeneratedEnvironment")
         self.data = env_metadata
         self.Ts = env_metadata.get("Ts", 0.01)
@@ -31,28 +44,29 @@ class ControlEnvironment:
         self.backend = backend
         self.sim = BDSim()
         self.scenarios = []
+        self.scenario = None
+        self._disturbance_cache = {}
+        self._plant_batch = None
         self._watchers = []
-        self._watch_map = {}
+        self.recorder = SignalRecorder(env_metadata.get("Logging", None))
 
         self.d = self.sim.blockdiagram(name=self.env_name)
 
     def watch_time(self, time):
-        watch_name = f"Time"
-        self._watch_map[watch_name] = len(self._watchers)
-        self._watchers.append(time)
+        self._time_watcher = time
 
-    def watch_reference(self, reference):
+    def watch_reference(self, reference, shape=None):
         watch_name = f"Reference"
-        self._watch_map[watch_name] = len(self._watchers)
+        self.recorder.add_signal(watch_name, shape)
         self._watchers.append(reference)
 
-    def watch_signal(self, signal_name: str, signal, override_name_from_block=None):
+    def watch_signal(self, signal_name: str, signal, override_name_from_block=None, shape=None):
         if override_name_from_block is not None:
             block_name = override_name_from_block.block.name
         else:
             block_name = signal.block.name
         watch_name = f"Signals.{block_name}.{signal_name}"
-        self._watch_map[watch_name] = len(self._watchers)
+        self.recorder.add_signal(watch_name, shape)
         self._watchers.append(signal)
 
     def generate(self, comp_descriptions, env_params, generate_scopes=False, live_metrics=None):
@@ -85,7 +99,7 @@ class ControlEnvironment:
             d.add_block(plant)
             null = Null(name="Null" + f"_{i}")
             d.add_block(null)
-            plant_noise = NoiseBlock(clock, system_dims)
+            plant_noise = NoiseBlock(clock, system_dims, name=f"Noise_{i}")
             d.add_block(plant_noise)
             d.connect(plant[0], plant_noise[0])
             d.connect(self.reference[0], controller[0])
@@ -99,13 +113,14 @@ class ControlEnvironment:
             self.plant_noise_blocks.append(plant_noise)
             self.plants.append(plant)
             self.ctls.append(controller)
-            self.watch_signal("u", controller[0])
-            self.watch_signal("y", plant[0], controller[0])
-            self.watch_signal("y_n", plant_noise[0], controller[0])
+            self.watch_signal("u", controller[0], shape=(system_dims["Inputs"],))
+            self.watch_signal("y", plant[0], controller[0], shape=(system_dims["Outputs"],))
+            self.watch_signal("y_n", plant_noise[0], controller[0], shape=(system_dims["Outputs"],))
             if i == 0:
-                system_metric = SystemMetric(self.live_metrics)
+                system_metric = SystemMetric(self.live_metrics, name="SystemMetric")
                 d.add_block(system_metric)
                 d.connect(plant_noise[0], system_metric[0])
+                self.system_metric = system_metric
             if generate_scopes:
                 scope = Scope(name="Scope" + f"_{i}", nin=2, )
                 d.add_block(scope)
@@ -113,6 +128,14 @@ class ControlEnvironment:
                 d.connect(controller[0], scope[1])
                 self.scopes.append(scope)
 
+        self.recorder_block = RecorderBlock(clock, self.recorder, len(self._watchers), name="Recorder")
+        d.add_block(self.recorder_block)
+        d.connect(self._time_watcher, self.recorder_block[0])
+        for i, watcher in enumerate(self._watchers):
+            d.connect(watcher, self.recorder_block[i + 1])
+
+        self.system_dims = system_dims
+        self.set_profiling(self.profile)
         env_data = {
             'dt': Ts,
             'system_dims': {
@@ -129,43 +152,418 @@ class ControlEnvironment:
     def select_scenario(self, index: int):
         if index < 0 or index >= len(self.scenarios):
             raise IndexError("Scenario index out of range.")
-        self.set_scenario(self.scenarios[index])
-        return self.scenarios[index]
+        return self.reset(self.scenarios[index])
+
+    def reset(self, scenario=None):
+        """
+        Rewinds the generated environment to the start of a scenario.
+
+        The block diagram is not generated or compiled again. Plugin states, live
+        metrics, block inputs and the recorder are reset, so consecutive runs on the
+        same environment do not depend on each other.
+
+        Args:
+            scenario (int | dict): Scenario index or description. The current scenario is used if None.
+        Returns:
+            dict: The scenario description.
+        """
+        if scenario is None:
+            scenario = self.scenario
+            if scenario is None:
+                raise ValueError("No scenario is selected.")
+        elif isinstance(scenario, (int, np.integer)):
+            if scenario < 0 or scenario >= len(self.scenarios):
+                raise IndexError("Scenario index out of range.")
+            scenario = self.scenarios[scenario]
+        self.set_scenario(scenario)
+        if hasattr(self, "system_metric"):
+            self.system_metric.reset_metrics()
+        # marks the block inputs of the previous run as unknown
+        self.d.reset()
+        self.recorder.reset()
+        return scenario
+
+    def set_profiling(self, enabled=True):
+        """
+        Enables or disables recording of the step times of the controller, plant,
+        noise and live metric blocks. The timings of every run are available as `SimOutput.timings`.
+        """
+        self.profile = enabled
+        self.profiler = StepProfiler() if enabled else None
+        blocks = self.ctls + self.plants + self.plant_noise_blocks
+        if hasattr(self, "system_metric"):
+            blocks.append(self.system_metric)
+        for block in blocks:
+            block.timer = self.profiler.histogram(block.name) if enabled else None
 
     def compile(self):
         self.d.compile()
         self.d.report_lists()
 
 
-    def run(self, T: float):
-        out = self.sim.run(self.d, T=T, dt=self.Ts, watch=self._watchers)
-        return SimOutput(out, watch_map=self._watch_map)
+    def run(self, T: float, engine=None, output_dir=None):
+        """
+        Runs the environment for T seconds.
+
+        If `output_dir` is given, the watched signals are streamed to memory-mapped
+        files in that directory and the returned `SimOutput` reads them from disk.
+        """
+        engine = engine if engine is not None else self.engine
+        if engine == "native":
+            return self.run_native(T, output_dir)
+        if engine != "bdsim":
+            raise ValueError(f"Unknown simulation engine '{engine}'. Available engines: {self.engines}")
+        self.recorder.allocate(self.num_steps(T), output_dir)
+        if self.profiler is not None:
+            self.profiler.start()
+        self.sim.run(self.d, T=T, dt=self.Ts)
+        # the outputs evaluated at the final time are not followed by a clock tick
+        self.recorder_block.flush()
+        return self.recorder_output()
+
+    def recorder_output(self):
+        timings = None
+        if self.profiler is not None:
+            self.profiler.stop()
+            timings = self.profiler.summary()
+        path = self.recorder.close()
+        if path is not None:
+            if timings is not None:
+                SimOutput.save_run_timings(path, timings)
+            return SimOutput.open(path)
+        out = SimOutput(self.recorder.output())
+        out.timings = timings
+        return out
+
+    def num_steps(self, T: float):
+        """Number of samples recorded in a run of length T, including t = 0 and t = T."""
+        return int(round(T / self.Ts)) + 1
+
+    def run_native(self, T: float, output_dir=None):
+        """
+        Runs the generated closed loop without the bdsim scheduler.
+
+        The diagram built in `generate` always has the same topology
+        (Reference -> ControllerBlock -> PlantBlock -> NoiseBlock -> ControllerBlock),
+        so the plugins are stepped directly and the watched signals are written
+        into the preallocated recorder buffers. Every sample first records the block outputs and
+        then advances all blocks with the inputs from that same sample, which matches
+        the clocked block semantics of the bdsim engine.
+        """
+        Ts = self.Ts
+        n = self.num_steps(T)
+        n_ctl = len(self.ctls)
+
+        out = self.run_closed_form(T, output_dir)
+        if out is not None:
+            return out
+
+        recorder = self.recorder
+        recorder.allocate(n, output_dir)
+        chunk_size = recorder.chunk_size if recorder.store is not None else 0
+        time = recorder.time
+        time[:] = np.arange(n) * Ts
+        # signals with logging policy 'off' have no log
+        ref_log = recorder.logs.get("Reference", None)
+        loop_logs = [[recorder.logs.get(f"Signals.{ctl.name}.{signal_name}", None) \
+            for signal_name in ("u", "y", "y_n")] for ctl in self.ctls]
+
+        loops = [(ctl.obj, plant.obj, noise.obj) for ctl, plant, noise \
+            in zip(self.ctls, self.plants, self.plant_noise_blocks)]
+        # the noise of the whole run is drawn at once
+        for _, _, noise in loops:
+            noise.pregenerate_noise(n, Ts)
+        # bound step functions, wrapped to record their step times when profiling
+        steps = [(timed(ctl.obj.step, ctl.timer), timed(plant.obj.step, plant.timer),
+            timed(noise.obj.step, noise.timer)) for ctl, plant, noise \
+            in zip(self.ctls, self.plants, self.plant_noise_blocks)]
+        step_metrics = timed(self.system_metric.step_metrics, self.system_metric.timer) \
+            if n_ctl > 0 and len(self.system_metric.metrics) > 0 else None
+        # plants stepped together in one call, with the controller outputs gathered into U
+        plant_batch = self.batched_plant_step()
+        batch_step = None
+        if plant_batch is not None:
+            batch_step = timed(plant_batch, self.profiler.histogram("PlantBatch") \
+                if self.profiler is not None else None)
+        if self.profiler is not None:
+            self.profiler.start()
+
+        for k in range(n):
+            t = time[k]
+            r = self.reference.output(t, [], None)[0]
+            if ref_log is not None:
+                ref_log.write(k, r)
+            for i, (ctl, plant, noise) in enumerate(loops):
+                u_k = ctl.last_el
+                y_k = plant.last_el
+                y_n_k = noise.last_el
+                u_log, y_log, y_n_log = loop_logs[i]
+                if u_log is not None:
+                    u_log.write(k, u_k)
+                if y_log is not None:
+                    y_log.write(k, y_k)
+                if y_n_log is not None:
+                    y_n_log.write(k, y_n_k)
+                if i == 0 and step_metrics is not None:
+                    step_metrics(t, y_n_k)
+                ctl_step, plant_step, noise_step = steps[i]
+                ctl_step(r, y_n_k, Ts)
+                if plant_batch is None:
+                    plant_step(u_k, t, Ts)
+                else:
+                    plant_batch.U[:, i] = np.ravel(u_k)
+                noise_step(y_k, Ts)
+            if batch_step is not None:
+                batch_step(t, Ts)
+            if chunk_size and (k + 1) % chunk_size == 0:
+                recorder.flush()
+        recorder.count = n
+
+        return self.recorder_output()
+
+    def closed_loop_models(self):
+        """
+        Return a `ClosedLoopModel` of every control loop, or None if a block of
+        some loop has no linear model (see `Controller.linear_model`).
+        """
+        Ts = self.Ts
+        models = []
+        for ctl, plant, noise in zip(self.ctls, self.plants, self.plant_noise_blocks):
+            blocks = (ctl.obj.linear_model(Ts), plant.obj.linear_model(Ts), noise.obj.linear_model(Ts))
+            if any(b is None for b in blocks):
+                return None
+            try:
+                models.append(ClosedLoopModel(*blocks))
+            except ValueError:
+                return None
+        return models
+
+    def run_closed_form(self, T: float, output_dir=None):
+        """
+        Runs the closed loops with their linear models instead of stepping the plugins.
+
+        When every block of every loop is linear (time invariant), a loop is a single
+        linear system driven by the reference, see `ClosedLoopModel`. It is simulated
+        with one matrix product per sample and the signals are written to the recorder
+        as whole blocks. The plugin states are then set to the final loop states,
+        as if the plugins had been stepped.
+
+        Used by `run_native` unless 'LtiFastPath' is false in the environment metadata,
+        live metrics or profiling are enabled, or a block output hits its saturation
+        limits during the run.
+
+        Returns:
+            SimOutput: The run output, or None if the loops can not be run in closed form.
+        """
+        if not self.data.get("LtiFastPath", True) or self.profiler is not None \
+                or len(self.ctls) == 0 or len(self.system_metric.metrics) > 0:
+            return None
+        models = self.closed_loop_models()
+        if models is None:
+            return None
+
+        Ts = self.Ts
+        n = self.num_steps(T)
+        time = np.arange(n) * Ts
+        refs = np.array([np.ravel(self.reference.output(t, [], None)[0]) for t in time], dtype=float)
+        loops = []
+        for model, ctl, plant, noise in zip(models, self.ctls, self.plants, self.plant_noise_blocks):
+            if refs.shape[1] != model.N.shape[1] or any(b.obj.last_el is None for b in (ctl, plant, noise)):
+                return None
+            z0 = model.initial_state(ctl.obj.last_el, plant.obj.last_el, noise.obj.last_el)
+            Z = model.simulate(z0, refs)
+            if model.is_saturated(Z):
+                # the plugins clip their outputs, the generic loop handles that
+                return None
+            loops.append(Z)
+
+        recorder = self.recorder
+        recorder.allocate(n, output_dir)
+        recorder.time[:] = time
+        ref_log = recorder.logs.get("Reference", None)
+        if ref_log is not None:
+            ref_log.write_block(0, refs.reshape((n,) + ref_log.data.shape[1:]))
+        for model, Z, ctl in zip(models, loops, self.ctls):
+            _, _, _, u, y, y_n = model.split(Z[:n])
+            for signal_name, values in (("u", u), ("y", y), ("y_n", y_n)):
+                log = recorder.logs.get(f"Signals.{ctl.name}.{signal_name}", None)
+                if log is not None:
+                    log.write_block(0, values.reshape((n,) + log.data.shape[1:]))
+        for model, Z, ctl, plant, noise in zip(models, loops, self.ctls, self.plants, self.plant_noise_blocks):
+            last = model.store_state(Z[n])
+            for block, value in zip((ctl, plant, noise), last):
+                block.obj.last_el = value.reshape(np.shape(block.obj.last_el)).copy()
+        recorder.flush()
+        recorder.count = n
+
+        return self.recorder_output()
+
+    def run_batch(self, T: float, seeds):
+        """
+        Runs copies of the selected scenario in lockstep, one for every seed.
+
+        All copies of a block are advanced together with its `step_batch`, so
+        plugins with a vectorized implementation take one array operation per step
+        for the whole batch. The disturbances of every copy are seeded as by
+        `seed_disturbances`, so a copy gives the same result as a run seeded alike.
+        The global NumPy random generator is not reseeded per copy. All signals are
+        recorded at every step, regardless of the logging policies.
+
+        Args:
+            T (float): Simulation time.
+            seeds (list): Root seed (int or np.random.SeedSequence) of every copy.
+        Returns:
+            list: A `SimOutput` for every copy.
+        """
+        Ts = self.Ts
+        n = self.num_steps(T)
+        B = len(seeds)
+        seeds = [s if isinstance(s, np.random.SeedSequence) else np.random.SeedSequence(s) for s in seeds]
+        # plant i of copy b gets the i-th child of the copy seed
+        children = [seed.spawn(len(self.plant_noise_blocks)) for seed in seeds]
+
+        time = np.arange(n) * Ts
+        r0 = np.ravel(self.reference.output(time[0], [], None)[0])
+        ref = np.zeros((n,) + r0.shape)
+        loops = []
+        for i, (ctl, plant, noise) in enumerate(zip(self.ctls, self.plants, self.plant_noise_blocks)):
+            last = [np.tile(np.ravel(b.obj.last_el), (B, 1)) for b in (ctl, plant, noise)]
+            loops.append({
+                "blocks": (ctl.obj, plant.obj, noise.obj),
+                "states": [ctl.obj.init_batch(B), plant.obj.init_batch(B),
+                           noise.obj.init_batch(B, [c[i] for c in children])],
+                "last": last,
+                "logs": [np.zeros((B, n) + l.shape[1:]) for l in last],
+            })
+
+        for k in range(n):
+            t = time[k]
+            r = np.ravel(self.reference.output(t, [], None)[0])
+            ref[k] = r
+            R = np.broadcast_to(r, (B,) + r.shape)
+            for loop in loops:
+                ctl, plant, noise = loop["blocks"]
+                c_states, p_states, n_states = loop["states"]
+                u_k, y_k, y_n_k = loop["last"]
+                for log, value in zip(loop["logs"], loop["last"]):
+                    log[:, k] = value
+                c_states, u_next = ctl.step_batch(c_states, R, y_n_k, Ts)
+                p_states, y_next = plant.step_batch(p_states, u_k, t, Ts)
+                n_states, y_n_next = noise.step_batch(n_states, y_k, Ts)
+                loop["states"] = [c_states, p_states, n_states]
+                loop["last"] = [np.reshape(u_next, (B, -1)), np.reshape(y_next, (B, -1)), np.reshape(y_n_next, (B, -1))]
+
+        outputs = []
+        for b in range(B):
+            signals = {"Time": time, "Reference": ref}
+            for ctl, loop in zip(self.ctls, loops):
+                for signal_name, log in zip(("u", "y", "y_n"), loop["logs"]):
+                    signals[f"Signals.{ctl.name}.{signal_name}"] = log[b]
+            outputs.append(SimOutput(signals))
+        return outputs
+
+    def batched_plant_step(self):
+        """
+        Return a function stepping all plants in one call, or None if the plants
+        do not support it (see `CasadiDynSystem.batch_step_function`).
+
+        Batching is used with two or more plants and can be disabled with
+        'BatchPlants' set to false in the environment metadata.
+        """
+        plants = [plant.obj for plant in self.plants]
+        if len(plants) < 2 or not self.data.get("BatchPlants", True):
+            return None
+        batch_step_function = getattr(type(plants[0]), 'batch_step_function', None)
+        if batch_step_function is None:
+            return None
+        # the mapped function is rebuilt only when the plant instances change
+        if self._plant_batch is None or self._plant_batch.systems != plants:
+            self._plant_batch = batch_step_function(plants)
+        return self._plant_batch
 
     def set_scenario(self, scenario):
-        self.reference.set_data(scenario["Reference"][:, 0], scenario["Reference"][:, 1:])
+        self.reference.set_data(scenario["Reference"][:, 0], scenario["Reference"][:, 1:],
+            interpolation=scenario.get("ReferenceInterpolation", "hold"))
+        self.recorder.set_shape("Reference", np.shape(scenario["Reference"][0, 1:]))
 
         for i, plant_noise in enumerate(self.plant_noise_blocks):
             d = scenario.get("Disturbance", None)
             noise_obj = None
             sys_dims = plant_noise.system_dims
             if d is None or not d:
-                info = self.backend.get_plugin_info_from_lib("NoNoise", 'csbenchlab')
-                dist_class = get_plugin_class_from_info(info)
+                dist_class, _ = self.load_disturbance(None)
                 noise_obj = dist_class('Params', {}, 'SystemDims', sys_dims)
             else:
-                info = self.backend.get_plugin_info_from_lib(d["PluginName"], d["Lib"])
-                dist_class = get_plugin_class_from_info(info)
-                d_params = eval_plugin_params(self.env_path, d)
+                dist_class, d_params = self.load_disturbance(d)
+                d_overrides = scenario.get("DisturbanceParameterOverrides", None)
+                if d_overrides:
+                    d_params = self.override_params(d_params, d_overrides, d["PluginName"])
                 noise_obj = dist_class('Params', d_params, 'SystemDims', sys_dims)
             noise_obj.configure()
             plant_noise.obj = noise_obj
+        self.seed_disturbances(scenario.get("RandomSeed", None))
+
+        sys_overrides = scenario.get("SystemParameterOverrides", None)
+        if sys_overrides or self._system_overridden:
+            # plugins may build their model from parameters on construction,
+            # so overridden systems are instantiated again
+            sys_params = self._system_params
+            if sys_overrides:
+                sys_params = self.override_params(sys_params, sys_overrides, self._system_cls.__name__)
+            for i, plant in enumerate(self.plants):
+                plant.obj = self._system_cls('Params', sys_params, **self.plugin_kwargs(self._system_cls))
+                self._components["systems"][i] = plant.obj
+            self._system_overridden = bool(sys_overrides)
 
         for plant in self.plants:
             plant.obj.configure(np.array(scenario["SystemIc"]))
 
         for i, controller in enumerate(self.ctls):
             controller.obj.configure()
+        self.scenario = scenario
+
+    def load_disturbance(self, disturbance):
+        """
+        Return the plugin class and evaluated parameters of a scenario disturbance.
 
+        Both are cached, so switching scenarios does not import plugin modules or
+        evaluate parameter files again. `None` gives the 'NoNoise' plugin.
+        """
+        if disturbance is None:
+            key = ("NoNoise", "csbenchlab", None, None)
+        else:
+            key = tuple(disturbance.get(k, None) for k in ("PluginName", "Lib", "Id", "ParentComponentId"))
+        if key not in self._disturbance_cache:
+            info = self.backend.get_plugin_info_from_lib(key[0], key[1])
+            dist_class = get_plugin_class_from_info(info)
+            d_params = eval_plugin_params(self.env_path, disturbance) if disturbance is not None else {}
+            self._disturbance_cache[key] = (dist_class, d_params)
+        return self._disturbance_cache[key]
+
+    @staticmethod
+    def override_params(params, overrides, component_name=""):
+        """Return a copy of the component parameters with the given values overridden."""
+        values = dict(vars(params)) if params is not None else {}
+        for key, value in overrides.items():
+            if params is not None and key not in values:
+                raise ValueError(f"Cannot override parameter '{key}'. " +
+                                 f"Component '{component_name}' does not define it.")
+            values[key] = value
+        return SimpleNamespace(**values)
+
+    def seed_disturbances(self, seed=None):
+        """
+        Seeds the disturbance generators of all plants with independent random streams.
+
+        Args:
+            seed (int | np.random.SeedSequence): Root seed. Every plant gets its own
+                child spawned from it.
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        children = seed.spawn(len(self.plant_noise_blocks))
+        for plant_noise, child in zip(self.plant_noise_blocks, children):
+            plant_noise.obj.seed(child)
 
     def generate_component_instances(self, comp_descriptions, env_params, system_dims):
         sys_params = env_params[comp_descriptions["system"]["Id"]]
@@ -174,16 +572,37 @@ class ControlEnvironment:
             "Inputs": system_dims["Outputs"],
             "Outputs": system_dims["Inputs"],
         }
+        self._system_cls = sys_cls
+        self._system_params = sys_params
+        self._system_overridden = False
         self._components["controllers"] = []
         self._components["systems"] = []
         for ctrl_desc in comp_descriptions["controllers"]:
-            sys = sys_cls('Params', sys_params)
+            sys = sys_cls('Params', sys_params, **self.plugin_kwargs(sys_cls))
             self._components["systems"].append(sys)
             cls = self._module_classes[ctrl_desc["Id"]]
             ctrl_params = env_params[ctrl_desc["Id"]]
-            controller = cls('Params', ctrl_params, 'Mux', mux)
+            controller = cls('Params', ctrl_params, 'Mux', mux, **self.plugin_kwargs(cls, ctrl_desc))
             self._components["controllers"].append(controller)
 
+    def plugin_kwargs(self, plugin_cls, component=None):
+        """Keyword arguments for plugin instances, set from the environment metadata."""
+        kwargs = {}
+        # CasADi plugins compile their step functions to C if 'CasadiCodegen' is set
+        if getattr(plugin_cls, 'casadi_plugin__', False) and self.data.get("CasadiCodegen", False):
+            kwargs["codegen"] = True
+        # continuous CasADi systems take their integration method from 'CasadiIntegrator'
+        integrator = self.data.get("CasadiIntegrator", None)
+        if integrator and hasattr(plugin_cls, 'integrator_method'):
+            if "Method" in integrator:
+                kwargs["integrator_method"] = integrator["Method"]
+            if "Steps" in integrator:
+                kwargs["integrator_steps"] = int(integrator["Steps"])
+        # plugins declaring 'params_dir' may cache precomputed data next to their parameters
+        if component is not None and hasattr(plugin_cls, 'params_dir'):
+            kwargs["params_dir"] = str((Path(self.env_path) / get_component_param_file_path(component)).parent)
+        return kwargs
+
     def import_component_module(self, comp_desc):
         cls_name = comp_desc["PluginName"]
         info = self.backend.get_plugin_info_from_lib(comp_desc["PluginName"], comp_desc["Lib"])
@@ -1,22 +1,64 @@
 from bdsim import BDSim, SourceBlock, EventSource, ClockedBlock, TransferBlock, SinkBlock
 import numpy as np
+from csbenchlab.step_profiler import timed
 
 class Reference(SourceBlock, EventSource):
-    def __init__(self, **blockargs):
+
+    interpolation_modes = ["hold", "linear"]
+
+    def __init__(self, interpolation="hold", **blockargs):
         inames = []
         onames = ['y_ref']
         self.nout = len(onames)
         self.nin = len(inames)
+        self._check_interpolation(interpolation)
+        self.interpolation = interpolation
+        self._cursor = 0
         SourceBlock.__init__(self, inames=inames, onames=onames, **blockargs)
 
-
-    def set_data(self, t, points):
+    def _check_interpolation(self, interpolation):
+        if interpolation not in self.interpolation_modes:
+            raise ValueError(f"Unknown reference interpolation '{interpolation}'. " +
+                             f"Available modes: {self.interpolation_modes}")
+
+    def set_data(self, t, points, interpolation=None):
+        t = np.asarray(t, dtype=float).ravel()
+        if np.any(np.diff(t) < 0):
+            order = np.argsort(t, kind="stable")
+            t = t[order]
+            points = np.asarray(points)[order]
+        if interpolation is not None:
+            self._check_interpolation(interpolation)
+            self.interpolation = interpolation
         self.t = t
         self.y = points
+        self._cursor = 0
+
+    def index(self, t):
+        """Return the index of the last reference sample with time <= t."""
+        ts = self.t
+        i = self._cursor
+        n = len(ts)
+        # fast path for monotonic time: stay on the cursor or advance by one sample
+        if ts[i] <= t:
+            if i + 1 >= n or t < ts[i + 1]:
+                return i
+            if i + 2 >= n or t < ts[i + 2]:
+                self._cursor = i + 1
+                return i + 1
+        i = int(np.searchsorted(ts, t, side='right')) - 1
+        i = max(i, 0)
+        self._cursor = i
+        return i
 
     def output(self, t, inports, x):
-        i = sum([1 if t >= _t else 0 for _t in self.t]) - 1
-        out = self.y[i]
+        i = self.index(t)
+        if self.interpolation == "linear" and i + 1 < len(self.t) and t > self.t[i]:
+            t0, t1 = self.t[i], self.t[i + 1]
+            w = (t - t0) / (t1 - t0)
+            out = self.y[i] + w * (self.y[i + 1] - self.y[i])
+        else:
+            out = self.y[i]
         return [out]
 
 
@@ -27,6 +69,7 @@ class PlantBlock(ClockedBlock):
         self.info = info
         self.dims = dims
         self.obj = obj
+        self.timer = None
         inames = ['u', 't', 'dt']
         onames = ['y']
         self.nout = len(onames)
@@ -43,7 +86,7 @@ class PlantBlock(ClockedBlock):
 
 
     def next(self, t, inputs, x):
-        xnext = self.obj.step(*inputs)
+        xnext = timed(self.obj.step, self.timer)(*inputs)
         return xnext
 
 
@@ -51,18 +94,24 @@ class SystemMetric(SinkBlock):
 
     def __init__(self, metrics, **blockargs):
 
-        self.metrics = []
-        for m in metrics:
-            self.metrics.append(m())
+        self.metric_classes = metrics
+        self.timer = None
+        self.reset_metrics()
         inames = ['y']
         onames = []
         self.nout = len(onames)
         self.nin = len(inames)
         SinkBlock.__init__(self, inames=inames, onames=onames, **blockargs)
 
+    def reset_metrics(self):
+        self.metrics = [m() for m in self.metric_classes]
+
     def step(self, t, u):
+        timed(self.step_metrics, self.timer)(t, u[0])
+
+    def step_metrics(self, t, y):
         for metric in self.metrics:
-            metric(t, u[0])
+            metric(t, y)
 
 
 class ControllerBlock(ClockedBlock):
@@ -71,6 +120,7 @@ class ControllerBlock(ClockedBlock):
     def __init__(self, clock, info, obj, **blockargs):
         self.info = info
         self.obj = obj
+        self.timer = None
         inames = ['y_ref', 'y', 'dt']
         onames = ['u', 'log']
         self.nout = len(onames)
@@ -83,7 +133,7 @@ class ControllerBlock(ClockedBlock):
         return [self.obj.last_el, []]
 
     def next(self, t, u, x):
-        u_next = self.obj.step(*u)
+        u_next = timed(self.obj.step, self.timer)(*u)
         return u_next
 
 
@@ -93,6 +143,7 @@ class NoiseBlock(ClockedBlock):
     def __init__(self, clock, system_dims=None, obj=None, **blockargs):
         self.system_dims = system_dims
         self.obj = obj
+        self.timer = None
         inames = ['y', 'dt']
         onames = ['y_n']
         self.nout = len(onames)
@@ -106,5 +157,29 @@ class NoiseBlock(ClockedBlock):
         return [self.obj.last_el]
 
     def next(self, t, u, x):
-        u_next = self.obj.step(*u)
-        return u_next
\ No newline at end of file
+        u_next = timed(self.obj.step, self.timer)(*u)
+        return u_next
+
+
+class RecorderBlock(ClockedBlock):
+
+    def __init__(self, clock, recorder, nin, **blockargs):
+        self.recorder = recorder
+        inames = ['t'] + [f'x{i}' for i in range(nin)]
+        onames = []
+        self.nout = len(onames)
+        self.nin = len(inames)
+        self._x0 = [] # necessary for BDSim
+        ClockedBlock.__init__(self, clock=clock, inames=inames, onames=onames, **blockargs)
+
+    def output(self, t, u, x):
+        return []
+
+    def next(self, t, u, x):
+        # inputs are the outputs evaluated at the previous sample
+        self.recorder.record_sample(u[0], u[1:])
+        return np.array([])
+
+    def flush(self):
+        if self.inputs is not None:
+            self.recorder.record_sample(self.inputs[0], self.inputs[1:])
@@ -0,0 +1,420 @@
+from collections import deque
+from fnmatch import fnmatch
+from pathlib import Path
+import json, os
+import numpy as np
+
+
+LOGGING_POLICIES = ["full", "off", "decimate", "envelope", "trigger"]
+
+STORE_INDEX_FILE = "index.json"
+
+
+def _resize(buf, n, fill=0.0):
+    if isinstance(buf, np.memmap):
+        return _resize_memmap(buf, n, fill)
+    new = np.full((n,) + buf.shape[1:], fill, dtype=buf.dtype)
+    new[:len(buf)] = buf
+    return new
+
+
+def _resize_memmap(buf, n, fill=0.0):
+    # the file is extended in place, the samples already written stay on disk
+    buf.flush()
+    nbytes = n * buf.itemsize * int(np.prod(buf.shape[1:]))
+    if os.path.getsize(buf.filename) < nbytes:
+        with open(buf.filename, "r+b") as f:
+            f.seek(nbytes - 1)
+            f.write(b"\0")
+    new = np.memmap(buf.filename, dtype=buf.dtype, mode="r+", shape=(n,) + buf.shape[1:])
+    new[len(buf):] = fill
+    return new
+
+
+class SignalStore:
+    """
+    Run directory with one raw binary file per recorder buffer.
+
+    Buffers are memory-mapped, so recorded samples go straight to the files and
+    only the pages in use are kept in memory. `write_index` describes the stored
+    signals in 'index.json', from which `SimOutput.open` maps them back.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.buffers = {}
+
+    def create(self, name, shape, fill=0.0, dtype=float):
+        # empty files cannot be mapped
+        shape = (max(shape[0], 1),) + tuple(shape[1:])
+        buf = np.memmap(self.path / f"{name}.dat", dtype=dtype, mode="w+", shape=shape)
+        if fill != 0:
+            buf[:] = fill
+        self.buffers[name] = buf
+        return buf
+
+    def flush(self):
+        for buf in self.buffers.values():
+            buf.flush()
+
+    def describe(self, data):
+        """Return the index entry of a view into one of the stored buffers."""
+        filename = getattr(data, "filename", None)
+        return {
+            "File": os.path.basename(filename) if filename is not None else None,
+            "DType": data.dtype.str,
+            "Shape": list(data.shape[1:]),
+            "Count": len(data),
+        }
+
+    def write_index(self, index):
+        self.flush()
+        with open(self.path / STORE_INDEX_FILE, "w") as f:
+            json.dump(index, f, indent=4)
+
+
+class SignalLog:
+    """Records every sample of a signal."""
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.name = ""
+        self.store = None
+        self.data = np.zeros((0,) + self.shape)
+
+    def _buffer(self, n, suffix="", fill=0.0, shape=None, dtype=float):
+        shape = (n,) + (self.shape if shape is None else tuple(shape))
+        if self.store is None:
+            return np.full(shape, fill, dtype=dtype)
+        return self.store.create(self.name + suffix, shape, fill, dtype)
+
+    def allocate(self, n_steps):
+        self.data = self._buffer(n_steps)
+
+    def write(self, k, value):
+        if k >= len(self.data):
+            self.data = _resize(self.data, max(2 * len(self.data), k + 1))
+        self.data[k] = value
+
+    def write_block(self, k, values):
+        """Write consecutive samples, the first one at sample k."""
+        end = k + len(values)
+        if end > len(self.data):
+            self.data = _resize(self.data, max(2 * len(self.data), end))
+        self.data[k:end] = values
+
+    def entries(self, n):
+        """
+        Return a list of (suffix, data, time index) entries for a run of n samples.
+
+        The time index is either the step between recorded samples or an array with
+        the indices of the recorded samples.
+        """
+        return [("", self.data[:n], 1)]
+
+    def output(self, time):
+        """Return a list of (suffix, time, data) entries for the recorded samples."""
+        entries = []
+        for suffix, data, index in self.entries(len(time)):
+            t = time[::index] if isinstance(index, int) else time[index]
+            entries.append((suffix, t, data))
+        return entries
+
+
+class DecimatedLog(SignalLog):
+    """Records every k-th sample of a signal."""
+
+    def __init__(self, shape, every=1):
+        super().__init__(shape)
+        self.every = max(int(every), 1)
+
+    def allocate(self, n_steps):
+        super().allocate(-(-n_steps // self.every))
+
+    def write(self, k, value):
+        if k % self.every == 0:
+            super().write(k // self.every, value)
+
+    def write_block(self, k, values):
+        # first recorded sample at or after k
+        first = -(-k // self.every) * self.every
+        samples = values[first - k::self.every]
+        if len(samples) > 0:
+            super().write_block(first // self.every, samples)
+
+    def entries(self, n):
+        return [("", self.data[:-(-n // self.every)], self.every)]
+
+
+class EnvelopeLog(SignalLog):
+    """Records the element-wise minimum and maximum of a signal over windows of samples."""
+
+    def __init__(self, shape, window=1):
+        super().__init__(shape)
+        self.window = max(int(window), 1)
+        self.data_max = np.zeros((0,) + self.shape)
+
+    def allocate(self, n_steps):
+        m = -(-n_steps // self.window)
+        self.data = self._buffer(m, "_min", np.inf)
+        self.data_max = self._buffer(m, "_max", -np.inf)
+
+    def write(self, k, value):
+        j = k // self.window
+        if j >= len(self.data):
+            n = max(2 * len(self.data), j + 1)
+            self.data = _resize(self.data, n, np.inf)
+            self.data_max = _resize(self.data_max, n, -np.inf)
+        self.data[j] = np.minimum(self.data[j], value)
+        self.data_max[j] = np.maximum(self.data_max[j], value)
+
+    def write_block(self, k, values):
+        for j, value in enumerate(values):
+            self.write(k + j, value)
+
+    def entries(self, n):
+        # windows are stamped with the time of their first sample
+        m = -(-n // self.window)
+        return [("_min", self.data[:m], self.window), ("_max", self.data_max[:m], self.window)]
+
+
+class TriggerLog(SignalLog):
+    """
+    Records a window of samples around every sample where any element of the
+    signal exceeds the threshold in absolute value.
+    """
+
+    def __init__(self, shape, threshold=0.0, pre=0, post=0):
+        super().__init__(shape)
+        self.threshold = threshold
+        self.pre = max(int(pre), 0)
+        self.post = max(int(post), 0)
+        self.indices = np.zeros((0,), dtype=int)
+
+    def allocate(self, n_steps):
+        # the number of recorded samples is not known in advance
+        n = min(n_steps, max(16, self.pre + self.post + 1))
+        super().allocate(n)
+        self.indices = self._buffer(n, "_indices", shape=(), dtype=int)
+        self.count = 0
+        self._remaining = 0
+        self._history = deque(maxlen=self.pre)
+
+    def _append(self, k, value):
+        if self.count > 0 and self.indices[self.count - 1] >= k:
+            return
+        if self.count >= len(self.indices):
+            self.indices = _resize(self.indices, 2 * len(self.indices))
+        self.indices[self.count] = k
+        super().write(self.count, value)
+        self.count += 1
+
+    def write(self, k, value):
+        if np.any(np.abs(value) > self.threshold):
+            while self._history:
+                self._append(*self._history.popleft())
+            self._append(k, value)
+            self._remaining = self.post
+        elif self._remaining > 0:
+            self._append(k, value)
+            self._remaining -= 1
+        elif self.pre > 0:
+            self._history.append((k, np.array(value, copy=True)))
+
+    def write_block(self, k, values):
+        for j, value in enumerate(values):
+            self.write(k + j, value)
+
+    def entries(self, n):
+        # indices are increasing, so a view of the recorded ones stays in the streamed buffer
+        idx = self.indices[:self.count]
+        idx = idx[:np.searchsorted(idx, n)]
+        return [("", self.data[:len(idx)], idx)]
+
+
+def make_signal_log(policy, shape):
+    """
+    Create the log of a signal from its logging policy.
+
+    Args:
+        policy (dict | str): Policy name or a dictionary with the 'Policy' name and its options:
+            'full', 'off', 'decimate' ('Every'), 'envelope' ('Window'),
+            'trigger' ('Threshold', 'Pre', 'Post').
+        shape (tuple): Shape of one sample of the signal.
+    Returns:
+        SignalLog: The log, or None if the signal is not recorded.
+    """
+    if policy is None:
+        policy = {}
+    if isinstance(policy, str):
+        policy = {"Policy": policy}
+    name = policy.get("Policy", "full")
+    if name == "full":
+        return SignalLog(shape)
+    elif name == "off":
+        return None
+    elif name == "decimate":
+        return DecimatedLog(shape, policy.get("Every", 1))
+    elif name == "envelope":
+        return EnvelopeLog(shape, policy.get("Window", 1))
+    elif name == "trigger":
+        return TriggerLog(shape, policy.get("Threshold", 0.0), policy.get("Pre", 0), policy.get("Post", 0))
+    raise ValueError(f"Unknown logging policy '{name}'. Available policies: {LOGGING_POLICIES}")
+
+
+class SignalRecorder:
+    """
+    Records watched signals into preallocated arrays.
+
+    Every signal is stored in buffers sized from the number of steps of the run.
+    When the run is given a directory, the buffers are memory-mapped files in it,
+    flushed to disk every `chunk_size` samples.
+    How a signal is stored is given by its logging
+    policy, matched by signal name (fnmatch patterns such as 'Signals.*.y_n' are allowed).
+    Signals with unknown shape are allocated on their first write.
+    `output` returns views into the buffers, so no data is copied when a `SimOutput`
+    is built from them.
+    """
+
+    def __init__(self, policies=None, chunk_size=4096):
+        self.policies = policies if policies is not None else {}
+        self.chunk_size = chunk_size
+        self.shapes = {}
+        self.logs = {}
+        self.store = None
+        self.time = np.zeros((0,))
+        self.count = 0
+        self._n_steps = 0
+
+    @property
+    def names(self):
+        return list(self.shapes.keys())
+
+    def get_policy(self, name):
+        if name in self.policies:
+            return self.policies[name]
+        for pattern, policy in self.policies.items():
+            if fnmatch(name, pattern):
+                return policy
+        return None
+
+    def add_signal(self, name, shape=None):
+        self.shapes[name] = tuple(shape) if shape is not None else None
+
+    def set_shape(self, name, shape):
+        if name not in self.shapes:
+            raise ValueError(f"Signal '{name}' is not recorded.")
+        self.shapes[name] = tuple(shape)
+
+    def _make_log(self, name, shape):
+        log = make_signal_log(self.get_policy(name), shape)
+        if log is not None:
+            log.name = name
+            log.store = self.store
+            log.allocate(self._n_steps)
+            self.logs[name] = log
+        return log
+
+    def reset(self):
+        """Drop the buffers of the last run. Outputs built from them stay valid."""
+        self.store = None
+        self.logs = {}
+        self.time = np.zeros((0,))
+        self.count = 0
+
+    def allocate(self, n_steps, path=None):
+        """
+        Allocate new buffers for a run of n_steps samples.
+
+        Args:
+            n_steps (int): Expected number of samples.
+            path (str): Run directory the signals are streamed to. Signals are kept in memory if None.
+        """
+        # new arrays are created so outputs of previous runs stay valid
+        self._n_steps = n_steps
+        self.store = SignalStore(path) if path is not None else None
+        if self.store is not None:
+            self.time = self.store.create("Time", (n_steps,))
+        else:
+            self.time = np.zeros((n_steps,))
+        self.logs = {}
+        for name, shape in self.shapes.items():
+            if shape is not None:
+                self._make_log(name, shape)
+        self.count = 0
+
+    def record(self, k, name, value):
+        log = self.logs.get(name, None)
+        if log is None:
+            if self.shapes.get(name, None) is not None:
+                # signal is not logged
+                return
+            shape = np.shape(value)
+            self.shapes[name] = shape
+            log = self._make_log(name, shape)
+            if log is None:
+                return
+        log.write(k, value)
+
+    def record_sample(self, t, values):
+        """
+        Record one sample of all signals, given in the order they were added.
+
+        A sample with the same time as the last recorded one overwrites it.
+        """
+        k = self.count
+        if k > 0 and t <= self.time[k - 1]:
+            k -= 1
+        else:
+            if k >= len(self.time):
+                self.time = _resize(self.time, max(2 * len(self.time), 1))
+            self.count += 1
+        self.time[k] = t
+        for name, value in zip(self.shapes.keys(), values):
+            self.record(k, name, value)
+        if self.count % self.chunk_size == 0:
+            self.flush()
+
+    def flush(self):
+        """Write the samples recorded so far to the run directory, if there is one."""
+        if self.store is not None:
+            self.store.flush()
+
+    def close(self):
+        """
+        Finish the run. When streaming, the index of the stored signals is written
+        to the run directory.
+
+        Returns:
+            str: The run directory, or None if the signals are kept in memory.
+        """
+        if self.store is None:
+            return None
+        store = self.store
+        index = {"Time": store.describe(self.time[:self.count]), "Signals": {}}
+        for name, log in self.logs.items():
+            for suffix, data, time_index in log.entries(self.count):
+                entry = store.describe(data)
+                if isinstance(time_index, int):
+                    entry["Step"] = time_index
+                else:
+                    entry["Indices"] = store.describe(time_index)
+                index["Signals"][name + suffix] = entry
+        store.write_index(index)
+        self.store = None
+        return str(store.path)
+
+    def output(self) -> dict:
+        """
+        Return the recorded samples keyed by signal name, with the shared 'Time' vector.
+
+        Every signal is given as a (time, data) tuple, since decimated or triggered
+        signals are not sampled at every time step.
+        """
+        time = self.time[:self.count]
+        signals = {"Time": time}
+        for name, log in self.logs.items():
+            for suffix, t, data in log.output(time):
+                signals[name + suffix] = (t, data)
+        return signals
@@ -1,5 +1,12 @@
 import bdsim.components as bd
 from types import SimpleNamespace
+from pathlib import Path
+import json
+import numpy as np
+from csbenchlab.signal_recorder import STORE_INDEX_FILE
+from csbenchlab.step_profiler import timings_to_json
+
+TIMINGS_FILE = "timings.json"
 class TimeseriesData:
     def __init__(self, time, data):
         self.Time = time
@@ -7,27 +14,97 @@ class TimeseriesData:
 
 class SimOutput:
     def __init__(self, sim_output, watch_map: dict=None):
+        # per-block step times, set when the environment is profiled
+        self.timings = None
         if isinstance(sim_output, bd.BDStruct):
             self.parse_bdsim_output(sim_output, watch_map)
+        elif isinstance(sim_output, dict):
+            self.parse_native_output(sim_output)
 
 
     def __getitem__(self, key):
         return getattr(self.parsed, key)
 
+    @classmethod
+    def open(cls, path):
+        """
+        Open a simulation output streamed to a run directory.
+
+        Signals are memory-mapped read-only, so they are only loaded from disk
+        when accessed and traces larger than memory can be processed.
+        """
+        path = Path(path)
+        index_file = path / STORE_INDEX_FILE
+        if not index_file.exists():
+            raise ValueError(f"'{path}' is not a simulation output directory.")
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+
+        def load(entry):
+            shape = (entry["Count"],) + tuple(entry["Shape"])
+            if entry["Count"] == 0:
+                return np.zeros(shape, dtype=entry["DType"])
+            return np.memmap(path / entry["File"], dtype=entry["DType"], mode="r", shape=shape)
+
+        time = load(index["Time"])
+        signals = {"Time": time}
+        for name, entry in index["Signals"].items():
+            data = load(entry)
+            if "Indices" in entry:
+                t = time[load(entry["Indices"])]
+            else:
+                t = time[::entry["Step"]]
+            signals[name] = (t, data)
+        out = cls(signals)
+        out.path = str(path)
+        if (path / TIMINGS_FILE).exists():
+            with open(path / TIMINGS_FILE, 'r') as f:
+                out.timings = json.load(f)
+        return out
+
+    @staticmethod
+    def save_run_timings(path, timings):
+        timings_to_json(timings, Path(path) / TIMINGS_FILE)
+
+    def timings_to_json(self, path=None):
+        """Return the step timings of the run as a JSON string and write it to path if given."""
+        if self.timings is None:
+            raise ValueError("Simulation output has no timings. Enable profiling of the environment.")
+        return timings_to_json(self.timings, path)
+
     def parse_bdsim_output(self, sim_output: bd, watch_map) -> dict:
+        time_idx = watch_map.get("Time", None)
+        if time_idx is None:
+            raise ValueError("Time signal not found in watch map.")
+        signals = {
+            watch_name: getattr(sim_output, f"y{i}") for watch_name, i in watch_map.items()
+        }
+        self.parse_native_output(signals)
+
+    def parse_native_output(self, signals: dict):
+        """
+        Parse signals given as a dictionary keyed by their watch names.
+
+        Values are either arrays sampled at the 'Time' vector or (time, data) tuples
+        for signals with their own time vector (e.g. decimated signals).
+        """
         self.signals = SimpleNamespace()
         # parse all as timeseries data
-        time_idx = watch_map.get("Time", None)
-        if time_idx is not None:
-            self.time = getattr(sim_output, f"y{time_idx}")
-            time = self.time
-        else:
+        if "Time" not in signals:
             raise ValueError("Time signal not found in watch map.")
-        watch_map.pop("Time", None)
-        for watch_name, i in watch_map.items():
-            if watch_name == "Reference":
-                self.ref = \
-                TimeseriesData(time, getattr(sim_output, f"y{i}"))
+        self.time = signals["Time"]
+        for watch_name, data in signals.items():
+            if watch_name == "Time":
+                continue
+            if watch_name == "Timings":
+                self.timings = data
+                continue
+            if isinstance(data, tuple):
+                time, data = data
+            else:
+                time = self.time
+            if watch_name.startswith("Reference"):
+                setattr(self, "ref" + watch_name[len("Reference"):], TimeseriesData(time, data))
             else:
                 splits = watch_name.split(".")
                 if splits[0] == "Signals" and len(splits) >= 3:
@@ -36,4 +113,17 @@ class SimOutput:
                     if not hasattr(self.signals, block_name):
                         setattr(self.signals, block_name, SimpleNamespace())
                     setattr(getattr(self.signals, block_name), signal_name,
-                        TimeseriesData(time, getattr(sim_output, f"y{i}")))
\ No newline at end of file
+                        TimeseriesData(time, data))
+
+    def to_dict(self) -> dict:
+        """Return the watched signals as a dictionary of (time, data) tuples keyed by their watch names."""
+        signals = {"Time": self.time}
+        if self.timings is not None:
+            signals["Timings"] = self.timings
+        for name, value in self.__dict__.items():
+            if name.startswith("ref") and isinstance(value, TimeseriesData):
+                signals["Reference" + name[len("ref"):]] = (value.Time, value.Data)
+        for block_name, block_signals in self.signals.__dict__.items():
+            for signal_name, data in block_signals.__dict__.items():
+                signals[f"Signals.{block_name}.{signal_name}"] = (data.Time, data.Data)
+        return signals
@@ -0,0 +1,117 @@
+import math, json
+from time import perf_counter
+import numpy as np
+
+
+class TimingHistogram:
+    """
+    Histogram of call wall times with logarithmically spaced bins.
+
+    Only the bin counts, the total and the maximum are stored, so memory does
+    not grow with the number of calls. Percentiles are resolved to the bin
+    width, about 12% with the default 20 bins per decade.
+    """
+
+    def __init__(self, min_time=1e-7, max_time=1e3, bins_per_decade=20):
+        self.min_time = min_time
+        self.bins_per_decade = bins_per_decade
+        self._log_min = math.log10(min_time)
+        self.num_bins = int(math.ceil((math.log10(max_time) - self._log_min) * bins_per_decade))
+        self.reset()
+
+    def reset(self):
+        self.counts = np.zeros((self.num_bins,), dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, dt):
+        if dt > self.min_time:
+            i = min(int((math.log10(dt) - self._log_min) * self.bins_per_decade), self.num_bins - 1)
+        else:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    def percentile(self, p):
+        """Return the geometric center of the bin containing the p-th percentile."""
+        if self.count == 0:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), p / 100 * self.count))
+        i = min(i, self.num_bins - 1)
+        center = 10 ** (self._log_min + (i + 0.5) / self.bins_per_decade)
+        return min(center, self.max)
+
+    def summary(self):
+        return {
+            "Count": self.count,
+            "Total": self.total,
+            "Mean": self.total / self.count if self.count > 0 else 0.0,
+            "P50": self.percentile(50),
+            "P99": self.percentile(99),
+            "Max": self.max,
+        }
+
+
+class StepProfiler:
+    """
+    Collects per-block step times of a ControlEnvironment run.
+
+    Every profiled block gets its own `TimingHistogram`. The wall time of the
+    whole run is recorded as well, so the framework overhead is the run time
+    not spent in any of the blocks.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.run_time = 0.0
+        self._start = None
+
+    def histogram(self, name):
+        if name not in self.histograms:
+            self.histograms[name] = TimingHistogram()
+        return self.histograms[name]
+
+    def start(self):
+        for h in self.histograms.values():
+            h.reset()
+        self._start = perf_counter()
+
+    def stop(self):
+        if self._start is not None:
+            self.run_time = perf_counter() - self._start
+            self._start = None
+
+    def summary(self):
+        blocks = {name: h.summary() for name, h in self.histograms.items()}
+        in_blocks = sum(b["Total"] for b in blocks.values())
+        return {
+            "Run": self.run_time,
+            "Overhead": max(self.run_time - in_blocks, 0.0),
+            "Blocks": blocks,
+        }
+
+
+def timed(fn, histogram):
+    """Return `fn` wrapped to record the wall time of every call, or `fn` itself if histogram is None."""
+    if histogram is None:
+        return fn
+
+    def timed_fn(*args):
+        start = perf_counter()
+        result = fn(*args)
+        histogram.record(perf_counter() - start)
+        return result
+    return timed_fn
+
+
+def timings_to_json(timings, path=None):
+    """Return the timings as a JSON string and write it to path if given."""
+    s = json.dumps(timings, indent=4)
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(s)
+    return s
@@ -9,6 +9,7 @@ import numpy as np
 from csbenchlab.environment_data_manager import EnvironmentDataManager
 from csbenchlab.plugin_helpers import import_module_from_path
 from csbenchlab.helpers.metric_helpers import LiveMetricBase
+from csbenchlab.sim_output import SimOutput
 import scipy.io as sio
 from types import SimpleNamespace
 
@@ -65,7 +66,10 @@ def load_metrics(env_data_or_path):
 
 
 def eval_metrics(metrics, env_results_or_path):
-    if isinstance(env_results_or_path, str):
+    if isinstance(env_results_or_path, str) and os.path.isdir(env_results_or_path):
+        # results streamed to a run directory are memory-mapped
+        sim_results = SimOutput.open(env_results_or_path)
+    elif isinstance(env_results_or_path, str):
         sim_results = sio.loadmat(env_results_or_path)
     else:
         sim_results = env_results_or_path
@@ -91,7 +95,7 @@ if __name__ == "__main__":
 
     parser = ArgumentParser(description="Get information about a specific plugin.")
     parser.add_argument("--env-path", type=str, default="", help="Path to the environment directory.")
-    parser.add_argument("--results-path", type=str, default="", help="Path to the environment results file.")
+    parser.add_argument("--results-path", type=str, default="", help="Path to the environment results file or run directory.")
     args = parser.parse_args()
     env_path = args.env_path
     if not env_path or not os.path.exists(env_path):
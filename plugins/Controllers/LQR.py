@@ -1,5 +1,6 @@
 from csbenchlab.plugin import CasadiController
 from csbenchlab.descriptor import ParamDescriptor
+from csbenchlab.linear_model import LinearModel
 import casadi as ca
 import numpy as np
 
@@ -66,27 +67,29 @@ class LQR(CasadiController):
 
         return None
 
-    def casadi_step_fn(self):
-        # define inputs
-        y_ref = ca.MX.sym('y_ref', self.mux["Inputs"])
-        y = ca.MX.sym('y', self.mux["Inputs"])
-        dt = ca.MX.sym('dt')
-
-        # Determine K to use
+    def gain_matrix(self):
+        """Return the gain K of u = -K (y - y_ref) as a matrix."""
         K_py = self._K_py
         if K_py is None:
             # fallback to zero gain
             K_py = 0.0
-
-        # Convert to CasADi DM
         if np.isscalar(K_py):
             if self.mux["Inputs"] == self.mux["Outputs"]:
-                K = ca.DM(np.eye(self.mux["Outputs"]) * float(K_py))
-            else:
-                K = ca.DM(np.ones((self.mux["Outputs"], self.mux["Inputs"])) * float(K_py))
-        else:
-            K_arr = np.array(K_py)
-            K = ca.DM(K_arr)
+                return np.eye(self.mux["Outputs"]) * float(K_py)
+            return np.ones((self.mux["Outputs"], self.mux["Inputs"])) * float(K_py)
+        return np.array(K_py, dtype=float)
+
+    def linear_model(self, dt):
+        K = self.gain_matrix()
+        return LinearModel.static(np.hstack([K, -K]), self.params.sat_min, self.params.sat_max)
+
+    def casadi_step_fn(self):
+        # define inputs
+        y_ref = ca.MX.sym('y_ref', self.mux["Inputs"])
+        y = ca.MX.sym('y', self.mux["Inputs"])
+        dt = ca.MX.sym('dt')
+
+        K = ca.DM(self.gain_matrix())
 
         # tracking error (state error)
         e = (y - y_ref)
@@ -1,11 +1,30 @@
 from csbenchlab.plugin import CasadiController
 from csbenchlab.descriptor import ParamDescriptor
+from csbenchlab.explicit_mpc import ExplicitQPLaw
+from csbenchlab.casadi_codegen import plugin_cache_key, get_codegen_cache_dir
+from pathlib import Path
+from uuid import uuid4
 import casadi as ca
 import numpy as np
+import os
+
+
+# options silencing the QP solvers. 'printLevel' only silences the qpOASES iterations, the
+# qpOASES license notice is printed for every solver instance and cannot be disabled
+QP_SOLVER_OPTIONS = {
+    'qpoases': {'printLevel': 'none'},
+    'osqp': {'osqp': {'verbose': False}},
+    'qrqp': {'print_iter': False, 'print_header': False},
+}
 
 
 class MPC(CasadiController):
 
+    # the previous solution is kept as the initial guess of the next step
+    is_pure__ = False
+    # directory of the component parameter files, set by the environment
+    params_dir = None
+
     param_description = [
         ParamDescriptor(name='L', default_value=1),
         ParamDescriptor(name='A', default_value=0.0),
@@ -16,6 +35,21 @@ class MPC(CasadiController):
         ParamDescriptor(name='sat_max', default_value=np.inf),
         ParamDescriptor(name="Q", default_value=1.0),
         ParamDescriptor(name="R", default_value=1.0),
+        ParamDescriptor(name="warm_start", default_value=True,
+                        description="Start every solve from the shifted previous solution, " +
+                        "with 'ipopt' also from the shifted multipliers. The CasADi qpOASES interface " +
+                        "starts every solve cold, so its iterations are not reduced."),
+        ParamDescriptor(name="solver", default_value="ipopt",
+                        description="'ipopt' to solve the problem as a general NLP, or the QP solver of " +
+                        "the condensed problem ('qpoases', 'osqp', 'qrqp', ...)."),
+        ParamDescriptor(name="explicit", default_value=False,
+                        description="Precompute the piecewise affine control law over 'explicit_region' " +
+                        "and look it up instead of solving the QP online. Requires a QP 'solver'."),
+        ParamDescriptor(name="explicit_region", default_value=None,
+                        description="Bounds [[min, max], ...] of the explicit law region, for every state " +
+                        "followed by every reference."),
+        ParamDescriptor(name="explicit_grid", default_value=11,
+                        description="Grid points per dimension used to compute the explicit law."),
 
     ]
 
@@ -25,25 +59,130 @@ class MPC(CasadiController):
         self.x0 = ca.SX.sym('x0', self.params.A.shape[0], 1)  # state
         self.y_ref = ca.SX.sym('y_ref', self.params.C.shape[0], 1)  # reference state
         L = int(self.params.L)
+        nu = self.params.B.shape[1]
         cost = 0
         X = self.x0
         U = []
-        g = []
-        if self.params.D == 0:
-            self.params.D = np.zeros((self.params.B.shape[1], self.params.C.shape[0]))
+        if np.isscalar(self.params.D) and self.params.D == 0:
+            self.params.D = np.zeros((self.params.C.shape[0], nu))
         for k in range(L):
-            u_k = ca.SX.sym(f'u_{k}', self.params.B.shape[1], 1)
+            u_k = ca.SX.sym(f'u_{k}', nu, 1)
             X = self.params.A @ X + self.params.B @ u_k
             Y = self.params.C @ X + self.params.D @ u_k
-            cost += ca.sumsqr((Y - self.y_ref).T @ self.params.Q @ (Y - self.y_ref)) + ca.sumsqr(u_k.T @ self.params.R @ u_k)
-            g.append(u_k - self.params.sat_max < 0)
-            g.append(self.params.sat_min - u_k < 0)
+            cost += (Y - self.y_ref).T @ self.params.Q @ (Y - self.y_ref) + u_k.T @ self.params.R @ u_k
             U.append(u_k)
 
+        # input saturation is given as bounds on the decision variables
+        self.lbx = np.tile(np.broadcast_to(np.asarray(self.params.sat_min, dtype=float).ravel(), (nu,)), L)
+        self.ubx = np.tile(np.broadcast_to(np.asarray(self.params.sat_max, dtype=float).ravel(), (nu,)), L)
+        self.nu = nu
+        self.warm_start = bool(getattr(self.params, 'warm_start', True))
 
         opts = {'ipopt.print_level': 0, 'print_time': 0}
-        nlp = {'x': ca.vertcat(*U), 'f': cost, 'g': ca.vertcat(*g), 'p': ca.vertcat(self.x0, self.y_ref)}
-        self.solver = ca.nlpsol('solver', 'ipopt', nlp, opts)
+        if self.warm_start:
+            opts.update({
+                'ipopt.warm_start_init_point': 'yes',
+                'ipopt.warm_start_bound_push': 1e-9,
+                'ipopt.warm_start_bound_frac': 1e-9,
+                'ipopt.warm_start_slack_bound_push': 1e-9,
+                'ipopt.warm_start_slack_bound_frac': 1e-9,
+                'ipopt.warm_start_mult_bound_push': 1e-9,
+            })
+        solver = getattr(self.params, 'solver', 'ipopt')
+        if solver == 'ipopt':
+            nlp = {'x': ca.vertcat(*U), 'f': cost, 'p': ca.vertcat(self.x0, self.y_ref)}
+            self.solver = ca.nlpsol('solver', 'ipopt', nlp, opts)
+        else:
+            self.solver = self.build_condensed_qp(solver)
+        # the QP solvers take the multipliers as the initial active set, which the shifted
+        # multipliers do not predict reliably, so they are only started from the inputs.
+        # qpOASES ignores the initial guess and does not hot start between calls either.
+        self.warm_start_multipliers = solver == 'ipopt'
+        self.explicit_law = None
+        if getattr(self.params, 'explicit', False):
+            if solver == 'ipopt':
+                raise ValueError("Explicit MPC requires a QP solver, not 'ipopt'.")
+            self.explicit_law = self.load_explicit_law()
+
+    def build_condensed_qp(self, solver):
+        """
+        Build the MPC problem as a condensed QP in the inputs over the horizon.
+
+        With Y = Phi x0 + Gamma U the predicted outputs, the cost is
+        0.5 U' H U + (Fx x0 - Fr y_ref)' U. H, Fx and Fr are computed once here,
+        so every solve only evaluates the linear term.
+        """
+        A, B = np.atleast_2d(self.params.A), np.atleast_2d(self.params.B)
+        C, D = np.atleast_2d(self.params.C), np.atleast_2d(self.params.D)
+        L = int(self.params.L)
+        nx, nu, ny = A.shape[0], B.shape[1], C.shape[0]
+        Q = np.broadcast_to(self.params.Q, (ny, ny)) if np.ndim(self.params.Q) < 2 else self.params.Q
+        R = np.broadcast_to(self.params.R, (nu, nu)) if np.ndim(self.params.R) < 2 else self.params.R
+
+        # A^(k+1) for k = 0..L-1
+        A_pow = [A]
+        for k in range(1, L):
+            A_pow.append(A @ A_pow[-1])
+        Phi = np.vstack([C @ A_pow[k] for k in range(L)])
+        Gamma = np.zeros((L * ny, L * nu))
+        for k in range(L):
+            for j in range(k + 1):
+                # the output of step k is computed from the state after applying u_k
+                A_kj = A_pow[k - j - 1] if k > j else np.eye(nx)
+                block = C @ A_kj @ B
+                if j == k:
+                    block = block + D
+                Gamma[k * ny:(k + 1) * ny, j * nu:(j + 1) * nu] = block
+        Q_bar = np.kron(np.eye(L), Q)
+        R_bar = np.kron(np.eye(L), R)
+        T = np.tile(np.eye(ny), (L, 1))
+
+        self.H = 2 * (Gamma.T @ Q_bar @ Gamma + R_bar)
+        self.Fx = 2 * Gamma.T @ Q_bar @ Phi
+        self.Fr = 2 * Gamma.T @ Q_bar @ T
+
+        # matrix valued MX expressions keep the Hessian extraction cheap for long horizons
+        U = ca.MX.sym('U', L * nu)
+        x0 = ca.MX.sym('x0', nx)
+        y_ref = ca.MX.sym('y_ref', ny)
+        g = ca.mtimes(ca.DM(self.Fx), x0) - ca.mtimes(ca.DM(self.Fr), y_ref)
+        qp = {'x': U, 'f': 0.5 * ca.bilin(ca.DM(self.H), U, U) + ca.dot(g, U),
+              'p': ca.vertcat(x0, y_ref)}
+        opts = {'print_time': False, 'error_on_fail': False, **QP_SOLVER_OPTIONS.get(solver, {})}
+        return ca.qpsol('solver', solver, qp, opts)
+
+    def explicit_law_path(self):
+        """Path of the explicit law cache file, next to the component parameters if known."""
+        directory = Path(self.params_dir) if self.params_dir is not None else get_codegen_cache_dir()
+        return directory / f"{type(self).__name__}_explicit_{plugin_cache_key(self)}.npz"
+
+    def load_explicit_law(self):
+        """Load the explicit law from its cache file, computing and saving it on a miss."""
+        path = self.explicit_law_path()
+        if path.exists():
+            return ExplicitQPLaw.load(path)
+
+        region = getattr(self.params, 'explicit_region', None)
+        n_p = self.Fx.shape[1] + self.Fr.shape[1]
+        if region is None or np.shape(region) != (n_p, 2):
+            raise ValueError(f"Explicit MPC requires 'explicit_region' with {n_p} [min, max] bounds, " +
+                             f"one for every state and reference.")
+        num_points = int(getattr(self.params, 'explicit_grid', 11))
+        axes = [np.linspace(lo, hi, num_points) for lo, hi in np.asarray(region, dtype=float)]
+
+        def solve(p):
+            sol = self.solver(p=p, lbx=self.lbx, ubx=self.ubx)
+            if not self.solver.stats().get("success", False):
+                return None
+            return sol['x'].full().ravel()
+
+        law = ExplicitQPLaw.from_grid(self.H, np.hstack([self.Fx, -self.Fr]), self.lbx, self.ubx, axes, solve)
+        # parallel runs may compute the same law, so it is written under a unique name first
+        tmp_path = path.with_name(f"{path.stem}_{uuid4().hex}.npz")
+        with open(tmp_path, 'wb') as f:
+            law.save(f)
+        os.replace(tmp_path, path)
+        return law
 
     def casadi_step_fn(self):
         prepare_data = ca.vertcat(self.x0, self.y_ref)
@@ -53,6 +192,91 @@ class MPC(CasadiController):
         u = x[0:self.params.B.shape[1]]
 
 
-        out = ca.Function('mpc_step', [x], [u], ["x"], ['out'])
+        out = ca.Function('mpc_step', [x], [u], ["x"], ['u'])
         return [prepare_data, self.solver, out]
 
+    def on_configure(self):
+        n = self.solver.nnz_in('x0')
+        self._x_guess = np.zeros(n)
+        self._lam_x_guess = np.zeros(n)
+        self._lam_g_guess = np.zeros(self.solver.nnz_in('lam_g0'))
+        # statistics of every solve since the last configure
+        self.solver_stats = []
+
+    def shift(self, v):
+        """Shift a solution over the horizon by one step, repeating the last input."""
+        return np.concatenate([v[self.nu:], v[-self.nu:]])
+
+    def on_step(self, y_ref, y, dt, data=None, *args, **kwargs):
+        p = np.concatenate([np.ravel(y), np.ravel(y_ref)])
+        if self.explicit_law is not None:
+            x_opt = self.explicit_law.lookup(p)
+            if x_opt is not None:
+                self.solver_stats.append({"Iterations": 0, "SolveTime": 0.0, "Success": True,
+                                          "ReturnStatus": "explicit"})
+                if self.warm_start:
+                    # the multipliers of the last online solve do not belong to this solution
+                    self._x_guess = self.shift(x_opt)
+                    self._lam_x_guess = np.zeros_like(self._lam_x_guess)
+                    self._lam_g_guess = np.zeros_like(self._lam_g_guess)
+                return x_opt[:self.nu]
+
+        if self.warm_start and self.warm_start_multipliers:
+            sol = self.solver(x0=self._x_guess, p=p, lbx=self.lbx, ubx=self.ubx,
+                              lam_x0=self._lam_x_guess, lam_g0=self._lam_g_guess)
+        elif self.warm_start:
+            sol = self.solver(x0=self._x_guess, p=p, lbx=self.lbx, ubx=self.ubx)
+        else:
+            sol = self.solver(p=p, lbx=self.lbx, ubx=self.ubx)
+        stats = self.solver.stats()
+        # the CasADi QP interfaces report -1 when the solver does not count its iterations
+        iterations = stats.get("iter_count", -1)
+        self.solver_stats.append({
+            "Iterations": iterations if iterations >= 0 else None,
+            "SolveTime": stats.get("t_wall_total", 0.0),
+            "Success": bool(stats.get("success", False)),
+            "ReturnStatus": stats.get("return_status", ""),
+        })
+        x_opt = sol['x'].full().ravel()
+        if self.warm_start:
+            self._x_guess = self.shift(x_opt)
+            if self.warm_start_multipliers:
+                self._lam_x_guess = self.shift(sol['lam_x'].full().ravel())
+                self._lam_g_guess = sol['lam_g'].full().ravel()
+        return x_opt[:self.nu]
+
+    def check_warm_start(self, num_states=200, state_range=2.0, ref_range=0.1, seed=None, tol=1e-4):
+        """
+        Compare warm started solves with cold solves over random states.
+
+        The controller is stepped through states and references drawn uniformly
+        from [-state_range, state_range] and [-ref_range, ref_range], every solve
+        warm started from the previous one as in a run. Every input is compared
+        with the input of a cold solve at the same point. The warm start and the
+        statistics of the controller are restored afterwards.
+
+        Returns:
+            dict: Number of inputs differing by more than tol ('Mismatches'), the
+                largest difference ('MaxError') and the number of inputs outside
+                the saturation limits by more than tol ('BoundViolations').
+        """
+        rng = np.random.default_rng(seed)
+        saved = (self._x_guess, self._lam_x_guess, self._lam_g_guess, self.solver_stats)
+        self.solver_stats = []
+        lb, ub = self.lbx[:self.nu], self.ubx[:self.nu]
+        errors, violations = [], 0
+        try:
+            for _ in range(num_states):
+                y = rng.uniform(-state_range, state_range, self.params.A.shape[0])
+                y_ref = rng.uniform(-ref_range, ref_range, self.params.C.shape[0])
+                u = np.ravel(self.on_step(y_ref, y, None))
+                sol = self.solver(p=np.concatenate([y, y_ref]), lbx=self.lbx, ubx=self.ubx)
+                errors.append(np.max(np.abs(u - sol['x'].full().ravel()[:self.nu])))
+                violations += bool(np.any(u < lb - tol) or np.any(u > ub + tol))
+        finally:
+            self._x_guess, self._lam_x_guess, self._lam_g_guess, self.solver_stats = saved
+        return {
+            "Mismatches": int(np.sum(np.array(errors) > tol)),
+            "MaxError": float(np.max(errors, initial=0.0)),
+            "BoundViolations": violations,
+        }
@@ -1,5 +1,6 @@
 from csbenchlab.plugin import Controller
 from csbenchlab.descriptor import ParamDescriptor
+from csbenchlab.linear_model import LinearModel
 import numpy as np
 
 
@@ -39,3 +40,59 @@ class PID(Controller):
         # u = np.array([0])
         return u
 
+    def linear_model(self, dt):
+        n = self.mux["Inputs"] if self.mux is not None else np.size(self._integral)
+        Kp = np.atleast_2d(self.params.Kp)
+        nu = Kp.shape[0]
+        if n != nu and n != 1:
+            # the integral and derivative terms would not broadcast to the output
+            return None
+        # maps the integral and derivative terms to the output
+        S = np.eye(nu) if n == nu else np.ones((nu, 1))
+        # error e = y_ref - y for the input [y_ref; y]
+        E = np.hstack([np.eye(n), -np.eye(n)])
+        Ki, Kd = self.params.Ki, self.params.Kd
+        kd = Kd / dt if Kd != 0.0 and dt > 0 else 0.0
+
+        # state [integral; previous error]
+        A = np.zeros((2 * n, 2 * n))
+        B = np.zeros((2 * n, 2 * n))
+        C = np.zeros((nu, 2 * n))
+        A[:n, :n] = np.eye(n)
+        if Ki != 0.0:
+            B[:n] = dt * E
+            C[:, :n] = Ki * S
+        if Kd != 0.0:
+            B[n:] = E
+            C[:, n:] = -kd * S
+        else:
+            A[n:, n:] = np.eye(n)
+        D = (Kp + (Ki * dt + kd) * S) @ E
+        x0 = np.concatenate([np.broadcast_to(self._integral, (n,)), np.broadcast_to(self._previous_error, (n,))])
+
+        def set_state(x):
+            self._integral, self._previous_error = np.array(x[:n]), np.array(x[n:])
+        return LinearModel(A, B, C, D, x0, self.params.sat_min, self.params.sat_max, set_state)
+
+    def init_batch(self, batch_size):
+        n = self.mux["Inputs"] if self.mux is not None else np.size(self._integral)
+        return {
+            "integral": np.tile(np.broadcast_to(self._integral, (n,)), (batch_size, 1)),
+            "previous_error": np.tile(np.broadcast_to(self._previous_error, (n,)), (batch_size, 1)),
+        }
+
+    def step_batch(self, states, y_ref, y, dt):
+        error = y_ref - y
+        u = error @ np.atleast_2d(self.params.Kp).T
+
+        if self.params.Ki != 0.0:
+            states["integral"] = states["integral"] + error * dt
+            u += self.params.Ki * states["integral"]
+        if self.params.Kd != 0.0:
+            derivative = (error - states["previous_error"]) / dt if dt > 0 else 0.0
+            u += self.params.Kd * derivative
+            states["previous_error"] = error
+
+        u = np.maximum(self.params.sat_min, np.minimum(self.params.sat_max, u))
+        return states, u
+
@@ -0,0 +1,27 @@
+from csbenchlab.plugin import FilteredNoiseGenerator
+from csbenchlab.descriptor import ParamDescriptor
+from scipy.signal import tf2sos
+import numpy as np
+
+
+class ARMANoise(FilteredNoiseGenerator):
+    """Autoregressive moving-average noise
+
+        n_k = ar_1 n_{k-1} + ... + ar_p n_{k-p} + e_k + ma_1 e_{k-1} + ... + ma_q e_{k-q}
+
+    driven by Gaussian white noise e_k with the standard deviation 'stddev'.
+    """
+
+    param_description = [
+        ParamDescriptor(name='mean', default_value=0.0),
+        ParamDescriptor(name='stddev', default_value=1.0),
+        ParamDescriptor(name='ar', default_value=[], description="Autoregressive coefficients ar_1, ..., ar_p."),
+        ParamDescriptor(name='ma', default_value=[], description="Moving-average coefficients ma_1, ..., ma_q."),
+    ]
+
+    def noise_filter(self, dt):
+        b = self.params.stddev * np.concatenate([[1.0], np.ravel(np.asarray(self.params.ma, dtype=float))])
+        a = np.concatenate([[1.0], -np.ravel(np.asarray(self.params.ar, dtype=float))])
+        # tf2sos needs polynomials of equal length
+        n = max(len(a), len(b))
+        return tf2sos(np.pad(b, (0, n - len(b))), np.pad(a, (0, n - len(a))))
@@ -0,0 +1,31 @@
+from csbenchlab.plugin import FilteredNoiseGenerator
+from csbenchlab.plugin.FilteredNoiseGenerator import sos_noise_gain
+from csbenchlab.descriptor import ParamDescriptor
+from scipy.signal import butter
+import numpy as np
+
+
+class BandLimitedNoise(FilteredNoiseGenerator):
+    """Gaussian noise limited to a frequency band by a Butterworth filter.
+
+    A scalar 'cutoff' gives low-pass noise, a pair [low, high] band-pass noise.
+    The noise is scaled to the standard deviation 'stddev'.
+    """
+
+    param_description = [
+        ParamDescriptor(name='mean', default_value=0.0),
+        ParamDescriptor(name='stddev', default_value=1.0),
+        ParamDescriptor(name='cutoff', default_value=1.0, description="Cutoff frequency (Hz), or [low, high] band edges."),
+        ParamDescriptor(name='order', default_value=2),
+    ]
+
+    def noise_filter(self, dt):
+        cutoff = np.ravel(np.asarray(self.params.cutoff, dtype=float))
+        if np.any(cutoff <= 0) or np.any(cutoff >= 0.5 / dt):
+            raise ValueError(f"Cutoff frequencies {cutoff.tolist()} must be between 0 and the " +
+                             f"Nyquist frequency {0.5 / dt} Hz.")
+        btype = 'lowpass' if len(cutoff) == 1 else 'bandpass'
+        sos = butter(int(self.params.order), cutoff if btype == 'bandpass' else cutoff[0],
+                     btype=btype, fs=1.0 / dt, output='sos')
+        sos[0, :3] *= self.params.stddev / sos_noise_gain(sos)
+        return sos
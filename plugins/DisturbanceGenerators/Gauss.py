@@ -9,7 +9,8 @@ class Gauss(DisturbanceGenerator):
         ParamDescriptor(name='stddev', default_value=1.0),
     ]
 
-    def on_step(self, y, dt):
+    def draw_noise(self, rng, n, dt):
+        return rng.normal(self.params.mean, self.params.stddev, size=(n, self.system_dims["Outputs"]))
 
-        noise = np.random.normal(self.params.mean, self.params.stddev, size=np.shape(y))
-        return y + noise
\ No newline at end of file
+    def on_step(self, y, dt):
+        return self.apply_noise(y, self.next_noise(dt))
@@ -1,7 +1,18 @@
 from csbenchlab.plugin import DisturbanceGenerator
+from csbenchlab.linear_model import LinearModel
+import numpy as np
 
 
 class NoNoise(DisturbanceGenerator):
 
     def on_step(self, y, dt):
-        return y
\ No newline at end of file
+        return y
+
+    def linear_model(self, dt):
+        return LinearModel.static(np.eye(self.system_dims["Outputs"]))
+
+    def init_batch(self, batch_size, seeds=None):
+        return None
+
+    def step_batch(self, states, y, dt):
+        return states, y
@@ -0,0 +1,24 @@
+from csbenchlab.plugin import FilteredNoiseGenerator
+from csbenchlab.plugin.FilteredNoiseGenerator import sos_noise_gain
+from csbenchlab.descriptor import ParamDescriptor
+from scipy.signal import tf2sos
+import numpy as np
+
+
+# three-pole 1/f approximation, see J. O. Smith, 'Spectral Audio Signal Processing'
+PINK_B = [0.049922035, -0.095993537, 0.050612699, -0.004408786]
+PINK_A = [1.0, -2.494956002, 2.017265875, -0.522189400]
+
+
+class PinkNoise(FilteredNoiseGenerator):
+    """Gaussian 1/f (pink) noise scaled to the standard deviation 'stddev'."""
+
+    param_description = [
+        ParamDescriptor(name='mean', default_value=0.0),
+        ParamDescriptor(name='stddev', default_value=1.0),
+    ]
+
+    def noise_filter(self, dt):
+        sos = tf2sos(PINK_B, PINK_A)
+        sos[0, :3] *= self.params.stddev / sos_noise_gain(sos)
+        return sos
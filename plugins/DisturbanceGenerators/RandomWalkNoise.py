@@ -0,0 +1,20 @@
+from csbenchlab.plugin import FilteredNoiseGenerator
+from csbenchlab.descriptor import ParamDescriptor
+import numpy as np
+
+
+class RandomWalkNoise(FilteredNoiseGenerator):
+    """Random walk bias starting at 'mean'.
+
+    The bias is integrated white noise, its standard deviation grows as
+    'stddev' * sqrt(t), so the noise does not depend on the time step.
+    """
+
+    param_description = [
+        ParamDescriptor(name='mean', default_value=0.0, description="Initial bias."),
+        ParamDescriptor(name='stddev', default_value=1.0, description="Bias standard deviation after 1 s."),
+    ]
+
+    def noise_filter(self, dt):
+        # b_k = b_{k-1} + stddev * sqrt(dt) * e_k
+        return np.array([[self.params.stddev * np.sqrt(dt), 0.0, 0.0, 1.0, -1.0, 0.0]])
@@ -1,8 +1,16 @@
 from csbenchlab.plugin import DynSystem
 from csbenchlab.descriptor import ParamDescriptor
+from csbenchlab.linear_model import LinearModel
 import numpy as np
+import scipy.sparse as sp
 
 class LinearSystem(DynSystem):
+    """
+    Discrete linear system x_{k+1} = A x_k + B u_k, y_k = C x_{k+1} + D u_k.
+
+    The matrices may be given as scipy.sparse matrices, which are kept sparse
+    (in CSR format) for large models, e.g. discretized PDEs.
+    """
 
 
     param_description = [
@@ -22,6 +30,11 @@ class LinearSystem(DynSystem):
         }
 
     def on_configure(self):
+        for name in ('A', 'B', 'C', 'D'):
+            value = getattr(self.params, name)
+            if sp.issparse(value) and not isinstance(value, sp.csr_array):
+                # CSR arrays give fast products and return plain ndarrays
+                setattr(self.params, name, sp.csr_array(value))
         self.x_k = np.zeros((self.params.A.shape[0],))
 
     def on_step(self, u, t, dt, *args):
@@ -33,5 +46,24 @@ class LinearSystem(DynSystem):
         y_k = np.clip(y_k, self.params.sat_min, self.params.sat_max)
         return y_k
 
+    def linear_model(self, dt):
+        A, B, C, D = self.params.A, self.params.B, self.params.C, self.params.D
+
+        def set_state(x):
+            self.x_k = np.array(x)
+        # the output is computed from the updated state
+        return LinearModel(A, B, C @ A, C @ B + D, self.x_k,
+                           self.params.sat_min, self.params.sat_max, set_state)
+
+    def init_batch(self, batch_size):
+        return np.tile(self.x_k, (batch_size, 1))
+
+    def step_batch(self, states, u, t, dt):
+        # the states and inputs of the batch are the rows of x and u
+        x = states @ self.params.A.T + u @ self.params.B.T
+        y = x @ self.params.C.T + u @ self.params.D.T
+        y = np.clip(y, self.params.sat_min, self.params.sat_max)
+        return x, y
+
     def on_reset(self):
         self.x_k = np.zeros((self.A.shape[0],))
\ No newline at end of file